@@ -1,18 +1,21 @@
 import os
-# get environment variables
-app_path = os.getenv("APP_PATH")
+import sys
 
-backup_file = app_path + ".bkp"
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from csproj_snapshot import SNAPSHOT_FILE, take_snapshot, write_snapshot
 
-with open(app_path, "rb") as src:
-    content = src.read()
 
-with open(backup_file, "wb") as bkp:
-    bkp.write(content)
+def main():
+    # get environment variables
+    app_path = os.getenv("APP_PATH")
 
-print(f"Backup of {app_path} created in {backup_file}")
+    with open(app_path, "rb") as src:
+        content = src.read()
 
-print("Files in the directory:")
+    write_snapshot(take_snapshot({app_path: content}))
 
-for file in os.listdir(os.path.dirname(app_path)):
-    print(file)
\ No newline at end of file
+    print(f"Snapshot of {app_path} written to {SNAPSHOT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
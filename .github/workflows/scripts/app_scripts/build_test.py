@@ -1,34 +1,64 @@
-import subprocess
 import os
+import sys
+import re
+import json
+import time
 
-def build_dotnet_project(project_path):
-    try:
-        # Exécuter la commande de build .NET
-        result = subprocess.run(['dotnet', 'build', project_path], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        print("Build réussi:")
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print("Erreur lors du build:")
-        print(e.stderr)
-        exit(1)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from process_runner import run
+
+# "Lionk.Utils -> /src/Lib/Lionk.Utils/bin/Release/net8.0/Lionk.Utils.dll"
+PROJECT_BUILT_PATTERN = re.compile(r'^\s*([\w.]+) -> ')
+# "Passed!  - Failed: 0, Passed: 42, Skipped: 0, Total: 42, Duration: 3 s - LionkTest.dll (net8.0)"
+TEST_RESULT_PATTERN = re.compile(r'(Passed|Failed)!.*Duration: (.+?) - ([\w.]+)\.dll')
+
+def run_phase(phase, command, timings):
+    # Exécuter une phase en affichant la sortie ligne par ligne, au fil de l'eau,
+    # et relever la durée de la phase et de chaque projet
+    print(f"=== {phase}: {' '.join(command)}", flush=True)
+    start = time.monotonic()
+    projects = {}
+
+    def on_line(line, is_stderr):
+        print(line, end='', flush=True)
+        match = PROJECT_BUILT_PATTERN.match(line)
+        if match:
+            projects[match.group(1)] = round(time.monotonic() - start, 2)
+        match = TEST_RESULT_PATTERN.search(line)
+        if match:
+            projects[match.group(3)] = match.group(2)
 
-def test_dotnet_project(project_path):
-    try:
-        # Exécuter la commande de test .NET
-        result = subprocess.run(['dotnet', 'test', project_path], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        print("Tests réussis:")
-        print(result.stdout)
-    except subprocess.CalledProcessError as e:
-        print("Erreur lors des tests:")
-        print(e.stderr)
+    returncode = run(command, check=False, on_line=on_line, step=f"dotnet {phase}",
+                     project=os.path.splitext(os.path.basename(command[2]))[0]).returncode
+    timings[phase] = {'seconds': round(time.monotonic() - start, 2), 'exit_code': returncode, 'projects': projects}
+    if returncode != 0:
+        print(f"Erreur lors de la phase {phase}")
+        print_timings(timings)
         exit(1)
 
-if __name__ == "__main__":
+def print_timings(timings):
+    # Résumé structuré, les projets de build sont datés depuis le début de la phase
+    print("Timing summary:")
+    print(json.dumps(timings, indent=2))
+    timings_file = os.getenv('BUILD_TIMINGS_FILE')
+    if timings_file:
+        with open(timings_file, 'w') as file:
+            json.dump(timings, file, indent=2)
+
+def build_and_test(project_path, configuration):
+    # Restaurer une fois, construire une fois et tester sur la sortie du build
+    timings = {}
+    run_phase('restore', ['dotnet', 'restore', project_path], timings)
+    run_phase('build', ['dotnet', 'build', project_path, '--no-restore', '-c', configuration], timings)
+    run_phase('test', ['dotnet', 'test', project_path, '--no-build', '--no-restore', '-c', configuration], timings)
+    print_timings(timings)
+
+def main():
     # Chemin du projet .NET
     app_path = os.environ['APP_PATH']
 
-    # Construire le projet
-    build_dotnet_project(app_path)
+    # Construire puis tester le projet sans le recompiler
+    build_and_test(app_path, os.getenv('BUILD_CONFIGURATION', 'Debug'))
 
-    # Tester le projet
-    test_dotnet_project(app_path)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import hashlib
+import os
+import re
+import shutil
+
+# Local buildx cache, restored between runs by the workflow
+CACHE_DIR = os.getenv('BUILDX_CACHE_DIR', '.buildx-cache')
+
+# Compared in lower case, the repository uses Directory.Build.Props
+LOCKFILE_NAMES = {'packages.lock.json', 'directory.build.props', 'directory.packages.props'}
+
+# Cache directories of a key are named after it, the per-platform caches of
+# publish_package are other directories of CACHE_DIR and must be left alone
+KEY_PATTERN = re.compile(r'^[0-9a-f]{16}(-new)?$')
+
+STEP_PATTERN = re.compile(r'^#(\d+) \[(.+?) \d+/\d+\]')
+CACHED_PATTERN = re.compile(r'^#(\d+) CACHED')
+
+
+def get_cache_key(context_path, dockerfile='Dockerfile'):
+    # The key only changes with the Dockerfile and the dependency lock files
+    digest = hashlib.sha256()
+    files = [os.path.join(context_path, dockerfile)]
+    for root, dirs, names in os.walk(context_path):
+        dirs[:] = sorted(d for d in dirs if d not in ('bin', 'obj') and not d.startswith('.'))
+        files += [os.path.join(root, name) for name in sorted(names) if name.lower() in LOCKFILE_NAMES]
+    for file in files:
+        if os.path.isfile(file):
+            digest.update(os.path.relpath(file, context_path).replace('\\', '/').encode())
+            with open(file, 'rb') as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()[:16]
+
+
+def get_cache_args(key, cache_dir=CACHE_DIR):
+    # Import the cache of the key when it exists and export to a new directory,
+    # so that stale layers do not pile up in the cache
+    args = []
+    cache_src = os.path.join(cache_dir, key)
+    if not os.path.isdir(cache_src):
+        # Layers before the changed step are still valid, fall back to the last cache
+        previous = [os.path.join(cache_dir, entry) for entry in os.listdir(cache_dir)
+                    if KEY_PATTERN.match(entry) and not entry.endswith('-new')] if os.path.isdir(cache_dir) else []
+        cache_src = max(previous, key=os.path.getmtime) if previous else None
+    if cache_src:
+        print(f"Using buildx cache {cache_src}")
+        args += ['--cache-from', f"type=local,src={cache_src}"]
+    else:
+        print(f"No buildx cache for key {key}")
+    args += ['--cache-to', f"type=local,dest={os.path.join(cache_dir, key)}-new,mode=max"]
+    return args
+
+
+def rotate_cache(key, cache_dir=CACHE_DIR):
+    # Replace the cache of the key by the exported one, and drop other keys
+    cache_new = os.path.join(cache_dir, f"{key}-new")
+    if not os.path.isdir(cache_new):
+        return
+    for entry in os.listdir(cache_dir):
+        if KEY_PATTERN.match(entry) and entry != f"{key}-new":
+            shutil.rmtree(os.path.join(cache_dir, entry), ignore_errors=True)
+    os.rename(cache_new, os.path.join(cache_dir, key))
+
+
+def get_cache_stats(build_output):
+    # Parse the plain progress output of buildx: "#8 [linux/arm64 build-env 4/5] RUN ..."
+    # then "#8 CACHED" when the step was served from the cache
+    steps = {}
+    cached = set()
+    for line in build_output.splitlines():
+        match = STEP_PATTERN.match(line)
+        if match:
+            steps.setdefault(match.group(1), match.group(2))
+            continue
+        match = CACHED_PATTERN.match(line)
+        if match:
+            cached.add(match.group(1))
+
+    stats = {}
+    for step, stage in steps.items():
+        hits, total = stats.get(stage, (0, 0))
+        stats[stage] = (hits + (step in cached), total + 1)
+    return stats
+
+
+def print_cache_stats(stats):
+    print("Buildx cache hits:")
+    for stage, (hits, total) in sorted(stats.items()):
+        print(f"{stage:<40} {hits}/{total} ({100 * hits / total:.0f}%)")
@@ -1,30 +1,35 @@
 import os
-import subprocess
+import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from csproj_snapshot import load_snapshot
+from process_runner import run_command
+from release_journal import record
 
-def run_command(command):
-    result = subprocess.run(command, check=True, capture_output=True, text=True)
-    print(result.stdout.strip())
-    print(result.stderr.strip())
 
+def main():
+    # Get environment variables
+    app_path = os.getenv("APP_PATH")
+    bot_name = os.getenv("BOT_NAME")
+    bot_email = os.getenv("BOT_MAIL")
+    github_head_ref = os.getenv("GITHUB_HEAD_REF")
 
-# Get environment variables
-app_path = os.getenv("APP_PATH")
-bot_name = os.getenv("BOT_NAME")
-bot_email = os.getenv("BOT_MAIL")
-github_head_ref = os.getenv("GITHUB_HEAD_REF")
+    # Config git
+    run_command(["git", "config", "--global", "user.name", bot_name])
+    run_command(["git", "config", "--global", "user.email", bot_email])
 
-# Config git
-run_command(["git", "config", "--global", "user.name", bot_name])
-run_command(["git", "config", "--global", "user.email", bot_email])
+    # Fetch the latest changes
+    run_command(["git", "fetch", "origin", github_head_ref])
 
-# Fetch the latest changes
-run_command(["git", "fetch", "origin", github_head_ref])
+    run_command(["git", "add", app_path])
 
-run_command(["git", "add", app_path])
+    # Commit changes
+    run_command(["git", "commit", "-m", "Update project versions"])
 
-# Commit changes
-run_command(["git", "commit", "-m", "Update project versions"])
+    # Push changes
+    record('csproj_commit', snapshot=load_snapshot(), branch=github_head_ref)
+    run_command(["git", "push", "--force"])
 
-# Push changes
-run_command(["git", "push", "--force"])
+
+if __name__ == "__main__":
+    main()
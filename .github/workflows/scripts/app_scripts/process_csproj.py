@@ -1,71 +1,48 @@
 import os
-import xml.etree.ElementTree as ET
-import json
+import sys
 
-# Méthode pour écrire avec un formatage indente
-def indent(elem, level=0):
-    i = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for subelem in elem:
-            indent(subelem, level + 1)
-        if not subelem.tail or not subelem.tail.strip():
-            subelem.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from csproj_editor import CsprojEditError, edit_csproj
 
-def update_or_add_element(container, name, value):
-    element = container.find(name)
-    if element is not None:
-        # Modifier l'élément existant
-        element.text = value
-    else:
-        # Ajouter un nouvel élément
-        new_element = ET.SubElement(container, name)
-        new_element.text = value
 
+def main():
+    # get environment variables
 
-# get environment variables
+    app_path = os.getenv('APP_PATH')
 
-app_path = os.getenv('APP_PATH')
+    with open("changelog.txt", "r") as file:
+        changelogs = file.read().splitlines()
 
-with open("changelog.txt", "r") as file:
-    changelogs = file.read().splitlines()
+    with open("newversion.txt", "r") as file:
+        newversion = file.read()
 
-with open("newversion.txt", "r") as file:
-    newversion = file.read()
+    #get folder of APP_PATH
+    app_folder = os.path.dirname(app_path)
+    readme_file = os.path.join(app_folder, "README.md")
 
-#get folder of APP_PATH
-app_folder = os.path.dirname(app_path)
-readme_file = os.path.join(app_folder, "README.md")
 
+    description = f"\n\n## Change Log"
+    for change in changelogs:
+        description += f"\n- {change}"
+    description += "\n\n"
 
-description = f"\n\n## Change Log"
-for change in changelogs:
-    description += f"\n- {change}"
-description += "\n\n"
+    if os.path.exists(readme_file):
+        with open(readme_file, 'r') as file:
+            description += file.read()
 
-if os.path.exists(readme_file):
-    with open(readme_file, 'r') as file:
-        description += file.read()
+    with open("description.txt", "w") as file:
+        file.write(description)
 
-tree = ET.parse(app_path)
-root = tree.getroot()
-property_group = root.find('PropertyGroup')
+    # update or add Version and Description elements, the rest of the file is kept as is
+    try:
+        editor = edit_csproj(app_path, {"Version": newversion, "Description": description})
+    except CsprojEditError as e:
+        print(f"Error editing {app_path}: {e}")
+        sys.exit(1)
 
-# update or add Version and Description elements
-update_or_add_element(property_group ,"Version", newversion)
-update_or_add_element(property_group ,"Description", description)
+    # show the changes of the csproj file
+    print(editor.diff(app_path) or f"{app_path} unchanged")
 
-with open("description.txt", "w") as file:
-    file.write(description)
 
-indent(root)
-tree.write(app_path, encoding="utf-8", xml_declaration=True)
-
-# show the updated csproj file
-ET.dump(root)
+if __name__ == "__main__":
+    main()
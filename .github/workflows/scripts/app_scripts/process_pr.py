@@ -1,6 +1,11 @@
 import os
-import re
-import json
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from change_detector import detect_changes
+from csproj_model import load_csproj
+from pr_parser import Diagnostic, parse_app_title, parse_body, print_diagnostics
+from release_manifest import bump_version
 
 def main():
 
@@ -11,56 +16,40 @@ def main():
     print(f'Pull Request title: {PR_TITLE}')
     print(f'Pull Request body: {PR_BODY}')
 
-    #remove nuget: from PR_TITLE
     app_path = os.getenv('APP_PATH')
 
-    type = PR_TITLE.replace('app:', '').lower().strip()
+    type, diagnostics = parse_app_title(PR_TITLE)
     print(f'Type: {type}')
 
-
-    if type not in ['major', 'minor', 'patch']:
-        print(f'Invalid version type: {type}')
-        exit(1)
-
-    # Extract changelogs from PR body and convert to JSON
-    changelogs = []
-    for line in PR_BODY.splitlines():
-        line = line.strip()
-        if not line or line.startswith('//'):
-            continue
-        
-        elif line.startswith('-'):
-            # It's a changelog item
-            changelog = line.lstrip('-').strip()
-            changelogs.append(changelog)
+    # Extract changelogs from PR body, the app body has no project names
+    body = parse_body(PR_BODY or '')
+    diagnostics += body.diagnostics
+    changelogs = body.changelogs[None]
 
     print(f'Changelogs: {changelogs}')
 
-    #populate oldversions and newversions arrays
-
-    csproj = app_path
-    with open(csproj, 'r') as f:
-        content = f.read()
-        # if content contains <Version> tag, extract the version
-        if '<Version>' in content:
-            oldversion = re.search(r'<Version>(.*?)</Version>', content).group(1)
-        else:
-            oldversion = "0.0.0"
- 
-
-    major, minor, patch = map(int, oldversion.split('.'))
-    if type == 'major':
-        major += 1
-        minor = 0
-        patch = 0
-    elif type == 'minor':
-        minor += 1
-        patch = 0
-    elif type == 'patch':
-        patch += 1
-
-    newversion = f'{major}.{minor}.{patch}'
-
+    # if the project has a <Version> tag, use it as old version
+    oldversion = load_csproj(app_path).version or "0.0.0"
+    newversion = None
+    if type:
+        try:
+            newversion = bump_version(oldversion, type)
+        except ValueError as e:
+            diagnostics.append(Diagnostic(0, str(e)))
+
+    # 'flag' reports an app without effective changes since its last release,
+    # 'skip' refuses to release it
+    incremental = os.getenv('INCREMENTAL')
+    if incremental:
+        _, changed = detect_changes([app_path])
+        if not changed:
+            print(f'No effective changes in {app_path} since last release')
+            if incremental == 'skip':
+                diagnostics.append(Diagnostic(0, 'No effective changes since the last release'))
+
+    print_diagnostics(diagnostics)
+    if any(d.severity == 'error' for d in diagnostics):
+        exit(1)
 
     print(f'old version: {oldversion}, new version: {newversion}')
 
@@ -1,42 +1,112 @@
-import subprocess
 import sys
 import os
 
-def run_command(command):
-    try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print("STDOUT:", result.stdout.strip())
-        print("STDERR:", result.stderr.strip())
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command {command}: {e}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
+from buildx_cache import CACHE_DIR, get_cache_key, get_cache_args, rotate_cache, get_cache_stats, print_cache_stats
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+import process_runner
+from change_detector import save_released_state
+
+PLATFORMS = ['linux/amd64', 'linux/arm64']
+
+def run_command(command, step=None):
+    result = process_runner.run_command(command, step=step or ' '.join(command[:3]), project=os.getenv('APP_NAME'))
+    return result.stdout + result.stderr
+
+def build_platform_command(platform, sln_path, image, newversion, cache_args):
+    # Build and push a single platform under its own tag
+    return [
+        'docker', 'buildx', 'build', sln_path,
+        '--platform', platform,
+        '--tag', f"{image}:{newversion}-{platform.split('/')[-1]}",
+        '--progress', 'plain',
+        *cache_args,
+        '--push'
+    ]
+
+def build_per_platform(sln_path, image, newversion, cache_key):
+    # Build every platform concurrently, each with its own cache, then assemble
+    # the multi-arch manifest list. A failed platform does not interrupt the others.
+    cache_dirs = {platform: os.path.join(CACHE_DIR, platform.split('/')[-1]) for platform in PLATFORMS}
+    results = process_runner.run_all([
+        (build_platform_command(platform, sln_path, image, newversion, get_cache_args(cache_key, cache_dirs[platform])),
+         {'name': platform, 'step': f"docker buildx build {platform}", 'project': os.getenv('APP_NAME')})
+        for platform in PLATFORMS
+    ], len(PLATFORMS))
+    outputs = dict(zip(PLATFORMS, results))
+
+    for platform, result in outputs.items():
+        if isinstance(result, Exception):
+            print(f"Build failed for {platform}: {result}")
+            continue
+        rotate_cache(cache_key, cache_dirs[platform])
+        print(f"{platform}:")
+        print_cache_stats(get_cache_stats(result.stdout + result.stderr))
+
+    failed = [platform for platform, result in outputs.items() if isinstance(result, Exception)]
+    if failed:
+        print(f"Build failed for {failed}, per-arch images of the other platforms were kept")
         sys.exit(1)
 
-sln_path = os.getenv('SLN_PATH')
-app_name = os.getenv('APP_NAME')
-docker_registry = os.getenv('DOCKER_REGISTRY')
-gh_token = os.getenv('GH_TOKEN')
-print(f"Publishing {app_name} from {sln_path} to {docker_registry}")
+    run_command([
+        'docker', 'buildx', 'imagetools', 'create',
+        '--tag', f"{image}:{newversion}",
+        '--tag', f"{image}:latest",
+        *[f"{image}:{newversion}-{platform.split('/')[-1]}" for platform in PLATFORMS]
+    ])
+
+def build_multi_platform(sln_path, image, newversion, cache_key):
+    # Create image and push it to the registry
+    build_output = run_command([
+        'docker', 'buildx', 'build', sln_path,
+        '--platform', ','.join(PLATFORMS),
+        '--tag', f"{image}:{newversion}",
+        '--tag', f"{image}:latest",
+        '--progress', 'plain',
+        *get_cache_args(cache_key),
+        '--push'
+    ])
+    rotate_cache(cache_key)
+    print_cache_stats(get_cache_stats(build_output))
+
+def main():
+    sln_path = os.getenv('SLN_PATH')
+    app_name = os.getenv('APP_NAME')
+    docker_registry = os.getenv('DOCKER_REGISTRY')
+    gh_token = os.getenv('GH_TOKEN')
+    # 'per-platform' builds the platforms concurrently and assembles the manifest list
+    build_mode = os.getenv('BUILD_MODE', 'multi-platform')
+    print(f"Publishing {app_name} from {sln_path} to {docker_registry}")
 
-with open('newversion.txt', 'r') as file:
-    newversion = file.read().strip()
+    with open('newversion.txt', 'r') as file:
+        newversion = file.read().strip()
 
-print(f"Publishing {app_name} as version {newversion}")
+    print(f"Publishing {app_name} as version {newversion} ({build_mode})")
 
-run_command(['ls' , 'src'])
+    run_command(['ls' , 'src'])
 
-# Create a new builder instance
-run_command(['docker', 'buildx', 'create', '--name', 'mybuilder', '--use'])
+    # Create a new builder instance, a local registry is only reachable from the host network
+    builder_command = ['docker', 'buildx', 'create', '--name', 'mybuilder', '--use']
+    if docker_registry.startswith(('localhost', '127.0.0.1')):
+        builder_command += ['--driver-opt', 'network=host']
+    run_command(builder_command)
+
+    # Reuse the layers of the previous builds, keyed by Dockerfile and lock files
+    cache_key = get_cache_key(sln_path)
+    image = f"{docker_registry}/{app_name.lower()}"
+
+    try:
+        if build_mode == 'per-platform':
+            build_per_platform(sln_path, image, newversion, cache_key)
+        else:
+            build_multi_platform(sln_path, image, newversion, cache_key)
+    finally:
+        # Clean up the builder instance
+        run_command(['docker', 'buildx', 'rm', 'mybuilder'])
 
-# Create image and push it to the registry
-run_command([
-    'docker', 'buildx', 'build', sln_path,
-    '--platform', 'linux/amd64,linux/arm64',
-    '--tag', f"{docker_registry}/{app_name.lower()}:{newversion}",
-    '--tag', f"{docker_registry}/{app_name.lower()}:latest",
-    '--push'
-])
+    # The image is published, the app is the reference of the next INCREMENTAL run
+    if os.getenv('INCREMENTAL'):
+        save_released_state([os.getenv('APP_PATH')])
 
-# Clean up the builder instance
-run_command(['docker', 'buildx', 'rm', 'mybuilder'])
+if __name__ == "__main__":
+    main()
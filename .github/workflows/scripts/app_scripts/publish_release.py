@@ -1,59 +1,58 @@
-import subprocess
 import sys
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from git_tags import create_tags, get_tags_to_push
+from process_runner import run, run_command, CommandError, CommandTimeout
+from release_journal import record
 
-def run_command(command):
-    try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print("STDOUT:", result.stdout.strip())
-        print("STDERR:", result.stderr.strip())
-        return result.stdout.strip()
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command {command}: {e}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
-        sys.exit(1)
-
-
-def tag_exists(tag):
-    result = run_command(['git', 'tag', '-l', tag])
-    return tag in result
 
+def main():
+    app_path = os.getenv('APP_PATH')
+    app_name = os.getenv('APP_NAME')
+    bot_name = os.getenv('BOT_NAME')
+    bot_mail = os.getenv('BOT_MAIL')
 
-app_path = os.getenv('APP_PATH')
-app_name = os.getenv('APP_NAME')
-bot_name = os.getenv('BOT_NAME')
-bot_mail = os.getenv('BOT_MAIL')
 
+    with open("newversion.txt", 'r') as file:
+        newversion = file.read().strip()
 
-with open("newversion.txt", 'r') as file:
-    newversion = file.read().strip()
 
+    run_command(['git', 'config', '--global', 'user.name', bot_name])
+    run_command(['git', 'config', '--global', 'user.email', bot_mail])
 
-run_command(['git', 'config', '--global', 'user.name', bot_name])
-run_command(['git', 'config', '--global', 'user.email', bot_mail])
 
+    tag = f"{app_name}_{newversion}"
+    tags = run_command(['git', 'tag', '-l']).stdout.strip().split('\n')
+    print(f"Current tags: {tags}")
 
-tag = f"{app_name}_{newversion}"
-tags = run_command(['git', 'tag', '-l']).split('\n')
-print(f"Current tags: {tags}")
-
-print(f"Creating tag {tag}")
+    # A tag pushed on this commit by a previous attempt of the release is reused
+    try:
+        create_tags('origin', [tag])
+        to_push, _ = get_tags_to_push('origin', [tag])
+    except (ValueError, CommandError, CommandTimeout) as e:
+        print(e)
+        sys.exit(1)
 
-if tag_exists(tag):
-    print(f"Tag {tag} already exists. Exiting.")
-    sys.exit(1)
+    if to_push:
+        record('tag_push', tags=to_push, remote='origin')
+        run_command(['git', 'push', 'origin', tag])
+    else:
+        print(f"Tag {tag} already on origin")
 
-# Create the tag
+    # Extract description from description.txt
+    description = ""
+    with open("description.txt", 'r') as file:
+        description = file.read()
 
-run_command(['git', 'tag', '-a', tag, '-m', f"Release {tag}"])
-run_command(['git', 'push', 'origin', tag])
+    # Create the release with the description, a release that already exists is
+    # kept and not journaled
+    if run(['gh', 'release', 'view', tag], check=False, on_line=lambda line, is_stderr: None).returncode == 0:
+        print(f"Release {tag} already exists")
+        return
+    record('release_create', tag=tag, repository=os.getenv('GITHUB_REPOSITORY'))
+    run_command(['gh', 'release', 'create', tag, '--title', tag, '--notes', description])
 
-# Extract description from description.txt
-description = ""
-with open("description.txt", 'r') as file:
-    description = file.read()
 
-# Create the release with the description
-run_command(['gh', 'release', 'create', tag, '--title', tag, '--notes', description])
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+import backup_csproj
+import build_test
+import commit_csproj
+import process_csproj
+import process_pr
+import publish_package
+import publish_release
+from release_pipeline import Stage, main
+
+STAGES = [
+    Stage('prepare', [process_pr.main]),
+    Stage('build_test', [build_test.main]),
+    Stage('update_csproj', [backup_csproj.main, process_csproj.main, commit_csproj.main]),
+    Stage('publish_release', [publish_release.main]),
+    Stage('publish_package', [publish_package.main]),
+]
+
+if __name__ == "__main__":
+    main('app', STAGES)
@@ -0,0 +1,253 @@
+import os
+import sys
+import re
+import glob
+import json
+import shutil
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from process_runner import run
+
+TRX_NS = 'http://microsoft.com/schemas/VisualStudio/TeamTest/2010'
+NS = {'t': TRX_NS}
+
+NAMESPACE_PATTERN = re.compile(r'^\s*namespace\s+([\w.]+)', re.MULTILINE)
+CLASS_PATTERN = re.compile(r'^\s*((?:public|internal|sealed|partial|static|abstract|private|protected)\s+)*class\s+(\w+)', re.MULTILINE)
+TEST_ATTRIBUTE_PATTERN = re.compile(r'\[(Test|TestCase|TestCaseSource|Theory)\b')
+# Ports fixes ("int port = 2526", ".Port(2526)"): les fixtures qui utilisent le
+# même port ne peuvent pas tourner en même temps, même dans des dossiers séparés
+PORT_PATTERN = re.compile(r'(?i)\bport\W{0,3}(\d{2,5})\b')
+
+def discover_test_classes(test_dir):
+    # Trouver les classes de test NUnit: classes non privées, non statiques et
+    # non abstraites des fichiers qui déclarent des tests. Retourne aussi les
+    # ports fixes utilisés par chaque classe.
+    classes = []
+    ports = {}
+    for file in sorted(glob.glob(os.path.join(test_dir, '**', '*.cs'), recursive=True)):
+        if os.sep + 'bin' + os.sep in file or os.sep + 'obj' + os.sep in file:
+            continue
+        with open(file, 'r', encoding='utf-8-sig') as f:
+            content = f.read()
+        if not TEST_ATTRIBUTE_PATTERN.search(content):
+            continue
+        namespace = NAMESPACE_PATTERN.search(content)
+        file_ports = set(PORT_PATTERN.findall(content))
+        for match in CLASS_PATTERN.finditer(content):
+            modifiers = match.group(0)
+            if any(m in modifiers.split() for m in ('private', 'protected', 'static', 'abstract')):
+                continue
+            name = match.group(2)
+            test_class = f"{namespace.group(1)}.{name}" if namespace else name
+            classes.append(test_class)
+            ports[test_class] = file_ports
+    return classes, ports
+
+def group_classes(classes, ports):
+    # Regrouper les classes qui partagent un port, un groupe va toujours dans
+    # le même shard
+    groups = []
+    for test_class in classes:
+        merged = [test_class]
+        for group in [g for g in groups if any(ports[c] & ports[test_class] for c in g)]:
+            groups.remove(group)
+            merged = group + merged
+        groups.append(merged)
+    return groups
+
+def load_durations(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def partition(groups, durations, shard_count):
+    # Répartir les groupes les plus longs en premier sur le shard le moins
+    # chargé. Une classe sans historique compte pour la durée médiane.
+    known = sorted(durations[c] for group in groups for c in group if c in durations)
+    default = known[len(known) // 2] if known else 1.0
+    duration = lambda group: sum(durations.get(c, default) for c in group)
+    shards = [{'classes': [], 'duration': 0.0} for _ in range(min(shard_count, len(groups)))]
+    for group in sorted(groups, key=duration, reverse=True):
+        shard = min(shards, key=lambda s: s['duration'])
+        shard['classes'].extend(group)
+        shard['duration'] += duration(group)
+    return shards
+
+def get_test_assembly(project_path, configuration):
+    # Assembly de test dans la sortie du build (bin/<configuration>/<tfm>)
+    assembly = os.path.splitext(os.path.basename(project_path))[0] + '.dll'
+    outputs = glob.glob(os.path.join(os.path.dirname(project_path), 'bin', configuration, '*', assembly))
+    if len(outputs) != 1:
+        print(f"Expected one {assembly} in the build output, found {outputs}")
+        sys.exit(1)
+    return outputs[0]
+
+def run_shard(index, classes, test_assembly, results_dir):
+    # Les fixtures écrivent dans config/, data/ et logs/ à côté de l'assembly
+    # de test: chaque shard teste sa propre copie de la sortie du build
+    shard_dir = os.path.abspath(os.path.join(results_dir, f"shard{index}"))
+    work_dir = os.path.join(results_dir, f"work{index}")
+    shutil.copytree(os.path.dirname(test_assembly), work_dir)
+    assembly = os.path.join(os.path.abspath(work_dir), os.path.basename(test_assembly))
+    # Le point final évite que "FooTests" sélectionne aussi "FooTestsExtra"
+    test_filter = '|'.join(f"FullyQualifiedName~{c}." for c in classes)
+    command = [
+        'dotnet', 'test', assembly,
+        '--filter', test_filter,
+        '--logger', f"trx;LogFileName=shard{index}.trx",
+        '--results-directory', shard_dir,
+        '--collect', 'XPlat Code Coverage',
+    ]
+    result = run(command, name=f"shard{index}", check=False, cwd=work_dir)
+    print(f"=== shard {index} ({len(classes)} classes, {result.seconds:.1f}s, exit code {result.returncode})")
+    return result.returncode
+
+def get_class_durations(trx_files):
+    # Additionner la durée des tests de chaque classe
+    durations = {}
+    for trx_file in trx_files:
+        root = ET.parse(trx_file).getroot()
+        classes = {}
+        for test in root.iterfind('t:TestDefinitions/t:UnitTest', NS):
+            method = test.find('t:TestMethod', NS)
+            if method is not None:
+                classes[test.get('id')] = method.get('className')
+        for result in root.iterfind('t:Results/t:UnitTestResult', NS):
+            test_class = classes.get(result.get('testId'))
+            duration = result.get('duration')
+            if test_class and duration:
+                hours, minutes, seconds = duration.split(':')
+                durations[test_class] = durations.get(test_class, 0.0) + \
+                    int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    return durations
+
+def merge_trx(trx_files, output):
+    # Fusionner les résultats de tous les shards dans un seul rapport TRX
+    ET.register_namespace('', TRX_NS)
+    merged = ET.parse(trx_files[0])
+    root = merged.getroot()
+    counters = root.find('t:ResultSummary/t:Counters', NS)
+    summary = root.find('t:ResultSummary', NS)
+    for trx_file in trx_files[1:]:
+        other = ET.parse(trx_file).getroot()
+        for section in ('Results', 'TestDefinitions', 'TestEntries'):
+            target = root.find(f't:{section}', NS)
+            source = other.find(f't:{section}', NS)
+            if target is not None and source is not None:
+                target.extend(list(source))
+        other_counters = other.find('t:ResultSummary/t:Counters', NS)
+        if counters is not None and other_counters is not None:
+            for name, value in other_counters.attrib.items():
+                counters.set(name, str(int(counters.get(name, 0)) + int(value)))
+        other_summary = other.find('t:ResultSummary', NS)
+        if summary is not None and other_summary is not None and other_summary.get('outcome') != 'Completed':
+            summary.set('outcome', other_summary.get('outcome'))
+    merged.write(output, encoding='utf-8', xml_declaration=True)
+
+def merge_coverage(coverage_files, output):
+    # Fusionner les rapports Cobertura: les hits de chaque ligne sont additionnés
+    # et les taux de couverture recalculés
+    merged = ET.parse(coverage_files[0])
+    root = merged.getroot()
+    classes = {}
+    for package in root.iter('package'):
+        for cls in package.iter('class'):
+            classes[(package.get('name'), cls.get('name'), cls.get('filename'))] = cls
+
+    for coverage_file in coverage_files[1:]:
+        for package in ET.parse(coverage_file).getroot().iter('package'):
+            for cls in package.iter('class'):
+                key = (package.get('name'), cls.get('name'), cls.get('filename'))
+                if key not in classes:
+                    target_package = next((p for p in root.iter('package') if p.get('name') == key[0]), None)
+                    if target_package is None:
+                        target_package = ET.SubElement(root.find('packages'), 'package', name=key[0])
+                        ET.SubElement(target_package, 'classes')
+                    target_package.find('classes').append(cls)
+                    classes[key] = cls
+                    continue
+                target_lines = {line.get('number'): line for line in classes[key].iterfind('lines/line')}
+                for line in cls.iterfind('lines/line'):
+                    target = target_lines.get(line.get('number'))
+                    if target is None:
+                        classes[key].find('lines').append(line)
+                    else:
+                        target.set('hits', str(int(target.get('hits')) + int(line.get('hits'))))
+
+    total_valid = total_covered = 0
+    for package in root.iter('package'):
+        package_valid = package_covered = 0
+        for cls in package.iter('class'):
+            lines = cls.findall('lines/line')
+            covered = sum(1 for line in lines if int(line.get('hits')) > 0)
+            cls.set('line-rate', str(round(covered / len(lines), 4) if lines else 1))
+            package_valid += len(lines)
+            package_covered += covered
+        package.set('line-rate', str(round(package_covered / package_valid, 4) if package_valid else 1))
+        total_valid += package_valid
+        total_covered += package_covered
+    root.set('lines-valid', str(total_valid))
+    root.set('lines-covered', str(total_covered))
+    root.set('line-rate', str(round(total_covered / total_valid, 4) if total_valid else 1))
+    merged.write(output, encoding='utf-8', xml_declaration=True)
+
+def main():
+    project_path = os.getenv('TEST_PROJECT', 'src/Test/LionkTest.csproj')
+    configuration = os.getenv('BUILD_CONFIGURATION', 'Debug')
+    shard_count = int(os.getenv('TEST_SHARDS', os.cpu_count() or 1))
+    durations_file = os.getenv('TEST_DURATIONS', 'test_durations.json')
+    results_dir = os.getenv('TEST_RESULTS_DIR', 'TestResults')
+
+    classes, ports = discover_test_classes(os.path.dirname(project_path))
+    if not classes:
+        print(f"No test classes found in {os.path.dirname(project_path)}")
+        sys.exit(1)
+
+    durations = load_durations(durations_file)
+    shards = partition(group_classes(classes, ports), durations, shard_count)
+    for i, shard in enumerate(shards):
+        print(f"Shard {i}: ~{shard['duration']:.1f}s {shard['classes']}")
+
+    # Construire une seule fois, les shards testent la même sortie de build
+    build = run(['dotnet', 'build', project_path, '-c', configuration], check=False)
+    if build.returncode != 0:
+        print("Erreur lors du build")
+        sys.exit(1)
+
+    test_assembly = get_test_assembly(project_path, configuration)
+
+    # Les rapports d'un run précédent ne doivent pas être fusionnés à nouveau
+    shutil.rmtree(results_dir, ignore_errors=True)
+    os.makedirs(results_dir)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        returncodes = list(pool.map(
+            lambda i: run_shard(i, shards[i]['classes'], test_assembly, results_dir),
+            range(len(shards))))
+    print(f"Tests finished in {time.monotonic() - start:.1f}s")
+
+    trx_files = sorted(glob.glob(os.path.join(results_dir, 'shard*', '*.trx')))
+    if trx_files:
+        merge_trx(trx_files, os.path.join(results_dir, 'merged.trx'))
+        durations.update(get_class_durations(trx_files))
+        with open(durations_file, 'w') as file:
+            json.dump(durations, file, indent=2, sort_keys=True)
+        print(f"Merged {len(trx_files)} TRX reports into {os.path.join(results_dir, 'merged.trx')}")
+
+    coverage_files = sorted(glob.glob(os.path.join(results_dir, 'shard*', '**', 'coverage.cobertura.xml'), recursive=True))
+    if coverage_files:
+        merge_coverage(coverage_files, os.path.join(results_dir, 'coverage.cobertura.xml'))
+        print(f"Merged {len(coverage_files)} coverage reports into {os.path.join(results_dir, 'coverage.cobertura.xml')}")
+
+    if any(returncodes):
+        print(f"Failed shards: {[i for i, code in enumerate(returncodes) if code]}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import re
+
+from csproj_model import load_csproj
+
+# Effective hashes of the projects published by the last release
+STATE_FILE = os.getenv('RELEASE_STATE', 'release_state.json')
+
+# Build outputs and backups do not change what gets packed
+IGNORED_DIRS = {'bin', 'obj', 'output'}
+IGNORED_EXTENSIONS = ('.bkp',)
+
+# Imported by MSBuild into every project below their folder
+SHARED_BUILD_FILES = ('directory.build.props', 'directory.build.targets')
+
+# Elements rewritten by every release, they are not an input change
+RELEASE_ELEMENTS = re.compile(rb'<(Version|PackageReleaseNotes|Description)>.*?</\1>', re.DOTALL)
+
+
+def hash_project_tree(project_dir):
+    # Hash the relative path and content of every source file of a project
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(project_dir):
+        dirs[:] = sorted(d for d in dirs if d not in IGNORED_DIRS and not d.startswith('.'))
+        for name in sorted(files):
+            if name.endswith(IGNORED_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, project_dir).replace('\\', '/').encode())
+            digest.update(b'\0')
+            with open(path, 'rb') as file:
+                if name.endswith('.csproj'):
+                    digest.update(RELEASE_ELEMENTS.sub(b'', file.read()))
+                else:
+                    for chunk in iter(lambda: file.read(1 << 16), b''):
+                        digest.update(chunk)
+            digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def hash_shared_build_files(project_dir):
+    # Hash the Directory.Build files of the project folder and of its parents,
+    # up to the root of the repository
+    digest = hashlib.sha256()
+    directory = os.path.abspath(project_dir)
+    while True:
+        for name in sorted(os.listdir(directory)):
+            if name.lower() in SHARED_BUILD_FILES:
+                path = os.path.join(directory, name)
+                digest.update(os.path.relpath(path, project_dir).replace('\\', '/').encode())
+                digest.update(b'\0')
+                with open(path, 'rb') as file:
+                    digest.update(file.read())
+                digest.update(b'\0')
+        parent = os.path.dirname(directory)
+        if parent == directory or os.path.exists(os.path.join(directory, '.git')):
+            return digest.hexdigest()
+        directory = parent
+
+
+def get_effective_hash(csproj_file, memo=None):
+    # Combine the project tree hash with the effective hashes of its
+    # ProjectReference closure, so a change in a dependency changes the project
+    if memo is None:
+        memo = {}
+    csproj_file = os.path.normpath(os.path.abspath(csproj_file))
+    if csproj_file not in memo:
+        memo[csproj_file] = None
+        project_dir = os.path.dirname(csproj_file)
+        references = [
+            get_effective_hash(os.path.join(project_dir, path), memo)
+            for path in load_csproj(csproj_file).project_reference_paths
+        ]
+        digest = hashlib.sha256(hash_project_tree(project_dir).encode())
+        digest.update(hash_shared_build_files(project_dir).encode())
+        for reference in sorted(r for r in references if r):
+            digest.update(reference.encode())
+        memo[csproj_file] = digest.hexdigest()
+    return memo[csproj_file]
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(hashes, path=STATE_FILE):
+    state = load_state(path)
+    state.update(hashes)
+    with open(path, 'w') as file:
+        json.dump(state, file, indent=2, sort_keys=True)
+
+
+def save_released_state(csproj_files, path=STATE_FILE):
+    # Mark the projects as released, once their release has been published
+    hashes, _ = detect_changes(csproj_files, path)
+    save_state(hashes, path)
+
+
+def detect_changes(csproj_files, path=STATE_FILE):
+    # Return the effective hash of every project and the names of the projects
+    # whose hash differs from the last saved state
+    state = load_state(path)
+    memo = {}
+    hashes = {}
+    changed = []
+    for csproj_file in csproj_files:
+        name = os.path.splitext(os.path.basename(csproj_file))[0]
+        hashes[name] = get_effective_hash(csproj_file, memo)
+        if state.get(name) != hashes[name]:
+            changed.append(name)
+    return hashes, changed
@@ -0,0 +1,178 @@
+import difflib
+import re
+from dataclasses import dataclass, field
+from xml.sax.saxutils import escape, quoteattr
+
+# Markup tokens of a csproj file. Comments, CDATA sections, declarations and
+# text are never rewritten, only the spans of the edited elements change.
+TOKEN_PATTERN = re.compile(
+    rb'<!--.*?-->'
+    rb'|<!\[CDATA\[.*?\]\]>'
+    rb'|<\?.*?\?>'
+    rb'|<![A-Z][^>]*>'
+    rb'|<(?P<close>/?)(?P<name>[\w:.-]+)(?P<attributes>(?:[^>"\']|"[^"]*"|\'[^\']*\')*?)(?P<empty>/?)>',
+    re.DOTALL)
+ATTRIBUTE_PATTERN = re.compile(rb'([\w:.-]+)\s*=\s*(?:"([^"]*)"|\'([^\']*)\')')
+
+
+class CsprojEditError(Exception):
+    pass
+
+
+@dataclass
+class Element:
+    name: str
+    attributes: dict
+    start: int
+    end: int = None
+    # Span of the content, None for an empty element (<Name />)
+    inner_start: int = None
+    inner_end: int = None
+    children: list = field(default_factory=list)
+
+    def find(self, name):
+        return next((child for child in self.children if child.name == name), None)
+
+
+def parse_elements(content):
+    # Build the element tree with the byte spans of every element
+    root = Element('', {}, 0, len(content), 0, len(content))
+    stack = [root]
+    for match in TOKEN_PATTERN.finditer(content):
+        name = match.group('name')
+        if name is None:
+            continue
+        name = name.decode()
+        if match.group('close'):
+            element = stack.pop()
+            if element.name != name or element is root:
+                raise CsprojEditError(f"Unexpected </{name}> at offset {match.start()}")
+            element.inner_end = match.start()
+            element.end = match.end()
+            continue
+        attributes = {key.decode(): (double if double is not None else single).decode()
+                      for key, double, single in ATTRIBUTE_PATTERN.findall(match.group('attributes'))}
+        element = Element(name, attributes, match.start())
+        stack[-1].children.append(element)
+        if match.group('empty'):
+            element.end = match.end()
+        else:
+            element.inner_start = match.end()
+            stack.append(element)
+    if len(stack) > 1:
+        raise CsprojEditError(f"Unclosed <{stack[-1].name}>")
+    return root
+
+
+class CsprojEditor:
+    # Edit a csproj file in place: only the targeted elements are rewritten and
+    # new elements follow the indentation and line endings of the file
+
+    def __init__(self, content):
+        self.original = content
+        self.content = content
+        self.newline = b'\r\n' if b'\r\n' in content else b'\n'
+        self._parse()
+
+    def _parse(self):
+        root = parse_elements(self.content)
+        self.project = root.find('Project')
+        if self.project is None:
+            raise CsprojEditError("No <Project> element")
+
+    def _replace(self, start, end, data):
+        self.content = self.content[:start] + data + self.content[end:]
+        self._parse()
+
+    def _encode(self, text):
+        return text.replace('\r\n', '\n').replace('\n', self.newline.decode()).encode('utf-8')
+
+    def _indent_of(self, offset):
+        line_start = self.content.rfind(b'\n', 0, offset) + 1
+        prefix = self.content[line_start:offset]
+        return prefix if not prefix.strip() else b''
+
+    def _append_child(self, parent, data):
+        # Insert data as the last child of parent
+        if parent.children:
+            last = parent.children[-1]
+            self._replace(last.end, last.end, self.newline + self._indent_of(last.start) + data)
+            return
+        indent = self._indent_of(parent.start)
+        child_indent = indent + (self._indent_unit())
+        closing = self.newline + indent
+        if parent.inner_start is None:
+            # <Parent /> becomes <Parent>...</Parent>
+            open_tag = self.content[parent.start:parent.end].rstrip(b'/>').rstrip() + b'>'
+            self._replace(parent.start, parent.end, open_tag + self.newline + child_indent + data +
+                          closing + b'</' + parent.name.encode() + b'>')
+        else:
+            self._replace(parent.inner_start, parent.inner_end, self.newline + child_indent + data + closing)
+
+    def _indent_unit(self):
+        # Indentation step of the file, two spaces when it cannot be told
+        for child in self.project.children:
+            indent = self._indent_of(child.start)
+            if indent:
+                return indent
+        return b'  '
+
+    def _property_group(self):
+        group = self.project.find('PropertyGroup')
+        if group is None:
+            self._append_child(self.project, b'<PropertyGroup />')
+            group = self.project.find('PropertyGroup')
+        return group
+
+    def set_property(self, name, value):
+        # Set the text of the element in the first PropertyGroup, like msbuild
+        # reads it, adding the element when missing
+        text = self._encode(escape(value))
+        element = self._property_group().find(name)
+        if element is None:
+            self._append_child(self._property_group(), f"<{name}>".encode() + text + f"</{name}>".encode())
+        elif element.inner_start is None:
+            self._replace(element.start, element.end, f"<{name}>".encode() + text + f"</{name}>".encode())
+        elif self.content[element.inner_start:element.inner_end] != text:
+            self._replace(element.inner_start, element.inner_end, text)
+
+    def ensure_item(self, name, attributes):
+        # Add an item to the first ItemGroup unless an item of the same type
+        # already includes the same path
+        include = attributes['Include']
+        for group in (g for g in self.project.children if g.name == 'ItemGroup'):
+            if any(item.name == name and item.attributes.get('Include') == include for item in group.children):
+                return
+        item = f"<{name}" + ''.join(f" {key}={quoteattr(value)}" for key, value in attributes.items()) + " />"
+        group = self.project.find('ItemGroup')
+        if group is None:
+            self._append_child(self.project, b'<ItemGroup />')
+            group = self.project.find('ItemGroup')
+        self._append_child(group, item.encode())
+
+    @property
+    def changed(self):
+        return self.content != self.original
+
+    def diff(self, path):
+        return ''.join(difflib.unified_diff(
+            self.original.decode('utf-8-sig', errors='replace').splitlines(keepends=True),
+            self.content.decode('utf-8-sig', errors='replace').splitlines(keepends=True),
+            fromfile=f"a/{path}", tofile=f"b/{path}"))
+
+
+def edit_csproj(path, properties, items=(), content=None):
+    # Apply the edits to a csproj file and write it only when it changed.
+    # Returns the editor, whose diff shows what changed.
+    if content is None:
+        with open(path, 'rb') as file:
+            content = file.read()
+    editor = CsprojEditor(content)
+    for name, value in properties.items():
+        editor.set_property(name, value)
+    for name, attributes in items:
+        editor.ensure_item(name, attributes)
+    if editor.changed:
+        with open(path, 'wb') as file:
+            file.write(editor.content)
+    return editor
@@ -0,0 +1,109 @@
+import atexit
+import hashlib
+import json
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field, asdict
+
+# Parsed csproj files are persisted by content hash, so that the next steps
+# of a release only parse the files that changed in between
+CACHE_FILE = os.getenv('CSPROJ_CACHE', 'csproj_cache.json')
+CACHE_VERSION = 2
+
+
+@dataclass
+class CsprojModel:
+    sha256: str
+    version: str = None
+    release_notes: str = None
+    project_references: list = field(default_factory=list)
+    project_reference_paths: list = field(default_factory=list)
+    package_references: dict = field(default_factory=dict)
+    content: bytes = field(default=None, repr=False, compare=False)
+
+
+def _get_text(root, name):
+    element = root.find(f'PropertyGroup/{name}')
+    return element.text if element is not None else None
+
+
+def parse_csproj(content):
+    root = ET.fromstring(content)
+
+    project_references = []
+    project_reference_paths = []
+    for reference in root.iter('ProjectReference'):
+        include = reference.get('Include')
+        if include:
+            # csproj files use windows separators
+            path = include.replace('\\', '/')
+            project_reference_paths.append(path)
+            project_references.append(os.path.splitext(os.path.basename(path))[0])
+
+    package_references = {}
+    for reference in root.iter('PackageReference'):
+        include = reference.get('Include')
+        if include:
+            version = reference.get('Version')
+            if version is None and reference.find('Version') is not None:
+                version = reference.find('Version').text
+            package_references[include] = version
+
+    return CsprojModel(
+        sha256=hashlib.sha256(content).hexdigest(),
+        version=_get_text(root, 'Version'),
+        release_notes=_get_text(root, 'PackageReleaseNotes'),
+        project_references=project_references,
+        project_reference_paths=project_reference_paths,
+        package_references=package_references,
+        content=content,
+    )
+
+
+_cache = None
+_dirty = False
+
+
+def _load_cache():
+    global _cache
+    if _cache is None:
+        _cache = {}
+        try:
+            with open(CACHE_FILE, 'r') as file:
+                data = json.load(file)
+            if data.get('version') == CACHE_VERSION:
+                _cache = data['models']
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+    return _cache
+
+
+def load_csproj(csproj_file):
+    # Read the file once, and only parse it if its content is not in the cache
+    global _dirty
+    with open(csproj_file, 'rb') as file:
+        content = file.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+
+    cache = _load_cache()
+    if sha256 in cache:
+        return CsprojModel(sha256=sha256, content=content, **cache[sha256])
+
+    model = parse_csproj(content)
+    cached = asdict(model)
+    del cached['sha256'], cached['content']
+    cache[sha256] = cached
+    _dirty = True
+    return model
+
+
+def save_cache():
+    global _dirty
+    if _cache is None or not _dirty:
+        return
+    with open(CACHE_FILE, 'w') as file:
+        json.dump({'version': CACHE_VERSION, 'models': _cache}, file)
+    _dirty = False
+
+
+atexit.register(save_cache)
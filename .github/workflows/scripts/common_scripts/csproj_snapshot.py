@@ -0,0 +1,88 @@
+import base64
+import hashlib
+import json
+import os
+import subprocess
+
+# Original state of the project files touched by a release. A file identical
+# to the checked out commit is recorded by its git blob id only, anything else
+# keeps its bytes, so the manifest alone is enough to restore the files.
+SNAPSHOT_FILE = os.getenv('CSPROJ_SNAPSHOT', 'csproj_snapshot.json')
+SNAPSHOT_VERSION = 1
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def get_blob_id(content):
+    # Same id as `git hash-object`
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+def _git(*args, check=True):
+    result = subprocess.run(['git', *args], capture_output=True)
+    if check and result.returncode != 0:
+        raise SnapshotError(f"git {' '.join(args)} failed: {result.stderr.decode(errors='replace').strip()}")
+    return result
+
+
+def _get_head_blobs(paths):
+    # Blob ids of the paths in HEAD, in one git call
+    result = _git('ls-tree', '-z', 'HEAD', '--', *paths, check=False)
+    if result.returncode != 0:
+        return None, {}
+    blobs = {}
+    for entry in result.stdout.split(b'\0'):
+        if entry:
+            info, path = entry.split(b'\t', 1)
+            blobs[os.path.normpath(path.decode())] = info.split()[2].decode()
+    return _git('rev-parse', 'HEAD').stdout.decode().strip(), blobs
+
+
+def take_snapshot(files):
+    # files maps each path to its current bytes
+    commit, head_blobs = _get_head_blobs(list(files))
+    snapshot = {'version': SNAPSHOT_VERSION, 'commit': commit, 'files': {}}
+    for path, content in files.items():
+        blob = get_blob_id(content)
+        entry = {'blob': blob}
+        if head_blobs.get(os.path.normpath(path)) != blob:
+            entry['content'] = base64.b64encode(content).decode()
+        snapshot['files'][path] = entry
+    return snapshot
+
+
+def write_snapshot(snapshot, path=SNAPSHOT_FILE):
+    with open(path, 'w') as file:
+        json.dump(snapshot, file, indent=2)
+
+
+def load_snapshot(path=SNAPSHOT_FILE):
+    with open(path, 'r') as file:
+        snapshot = json.load(file)
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot version {snapshot.get('version')}")
+    return snapshot
+
+
+def restore_snapshot(snapshot):
+    # Write the original bytes of every file back, returns the restored paths
+    missing = [entry['blob'] for entry in snapshot['files'].values()
+               if 'content' not in entry and _git('cat-file', '-e', entry['blob'], check=False).returncode != 0]
+    if missing:
+        if not snapshot.get('commit'):
+            raise SnapshotError(f"Blobs {missing} are not available and the snapshot has no commit")
+        # Shallow checkouts do not have the commit the release started from
+        _git('fetch', '--depth=1', 'origin', snapshot['commit'])
+
+    for path, entry in snapshot['files'].items():
+        if 'content' in entry:
+            content = base64.b64decode(entry['content'])
+        else:
+            content = _git('cat-file', 'blob', entry['blob']).stdout
+        if get_blob_id(content) != entry['blob']:
+            raise SnapshotError(f"Snapshot of {path} is corrupted")
+        with open(path, 'wb') as file:
+            file.write(content)
+    return list(snapshot['files'])
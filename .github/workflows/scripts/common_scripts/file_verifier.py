@@ -0,0 +1,158 @@
+import os
+import subprocess
+import sys
+
+from github_api import GitHubClient, GitHubError, DEFAULT_API_URL
+
+# Extensions accepted by each kind of PR
+POLICY_PROFILES = {
+    'docs': ["md", "txt", "drawio", "png", "jpg", "jpeg", "gif", "svg"],
+    'workflow': ["yml", "py", "sh"],
+}
+
+def get_changed_files_from_env(changed_files):
+    # Liste calculée par le workflow (git diff --name-only), un fichier par ligne
+    for line in changed_files.splitlines():
+        if line.strip():
+            yield line.strip()
+
+def get_changed_files_from_git(base_sha, head_sha):
+    # Diff local depuis la base de fusion, sans aucun appel réseau: comme l'API,
+    # seuls les fichiers de la PR sont listés, pas ceux arrivés depuis sur main
+    result = subprocess.run(['git', 'diff', '--name-only', '-z', f"{base_sha}...{head_sha}"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"Error: git diff failed. {result.stderr.strip()}")
+        sys.exit(1)
+    for file in result.stdout.split('\0'):
+        if file:
+            yield file
+
+def get_changed_files_from_api(token, repo_name, pr_number):
+    # Produire les fichiers de la PR au fil des pages, sans attendre la liste complète
+    with GitHubClient(token, os.getenv("GITHUB_API_URL", DEFAULT_API_URL)) as client:
+        try:
+            for file in client.paginate(f"/repos/{repo_name}/pulls/{pr_number}/files"):
+                yield file['filename']
+        except GitHubError as e:
+            print(f"Error: Failed to fetch changed files. {e}")
+            sys.exit(1)
+
+def get_change_source():
+    # Choisir la source des fichiers modifiés: CHANGED_FILES, puis git en local
+    # avec BASE_SHA/HEAD_SHA, et l'API GitHub en dernier recours.
+    # CHANGE_SOURCE (env, git ou api) force une source.
+    source = os.getenv('CHANGE_SOURCE')
+    changed_files = os.getenv('CHANGED_FILES')
+    base_sha = os.getenv('BASE_SHA')
+    head_sha = os.getenv('HEAD_SHA')
+
+    if source == 'env' or (not source and changed_files):
+        return 'env', get_changed_files_from_env(changed_files or '')
+    if source == 'git' or (not source and base_sha and head_sha):
+        if not base_sha or not head_sha:
+            print("Error: BASE_SHA and HEAD_SHA are required by the git change source.")
+            sys.exit(1)
+        return 'git', get_changed_files_from_git(base_sha, head_sha)
+
+    token = os.getenv('GITHUB_TOKEN')
+    repo_name = os.getenv('REPO_NAME')
+    pr_number = os.getenv('PR_NUMBER')
+    if not token or not repo_name or not pr_number:
+        print("Error: Missing required environment variables.")
+        sys.exit(1)
+    return 'api', get_changed_files_from_api(token, repo_name, pr_number)
+
+def get_accepted_extensions(pr_body):
+    # Extraire les extensions de fichiers acceptées du corps de la PR
+    extensions = []
+    lines = pr_body.splitlines()
+    for line in lines:
+        if line.startswith("-"):
+            extensions.append(line.replace("-", "").strip())
+    return extensions
+
+def compile_extensions(accepted_extensions):
+    # "py", ".py" et "PY" désignent la même extension
+    return frozenset(ext.strip().lstrip('.').lower() for ext in accepted_extensions if ext.strip())
+
+def has_accepted_extension(file, extensions):
+    # Tester le nom complet, pour les fichiers sans extension ("Dockerfile",
+    # "LICENSE"), puis chaque suffixe complet ("a.tar.gz" -> "tar.gz", "gz").
+    # "numpy" ne correspond donc pas à l'extension "py".
+    name = file.rsplit('/', 1)[-1].lower()
+    if name in extensions:
+        return True
+    index = name.find('.')
+    while index != -1:
+        if name[index + 1:] in extensions:
+            return True
+        index = name.find('.', index + 1)
+    return False
+
+def check_files(changed_files, profiles, report_all=False):
+    # Évaluer tous les profils en une seule passe sur les fichiers. Un fichier
+    # est accepté si au moins un des profils l'accepte, chaque profil garde ses
+    # propres refus pour le rapport. La lecture s'arrête au premier fichier
+    # refusé par tous les profils, sauf si report_all est demandé.
+    # Retourne le nombre de fichiers vus, les refus de chaque profil et les
+    # fichiers refusés par tous les profils.
+    count = 0
+    rejected = {name: [] for name in profiles}
+    refused = []
+    for file in changed_files:
+        count += 1
+        accepted = False
+        for name, extensions in profiles.items():
+            if has_accepted_extension(file, extensions):
+                accepted = True
+            else:
+                rejected[name].append(file)
+        if not accepted:
+            refused.append(file)
+            if not report_all:
+                break
+    return count, rejected, refused
+
+def main(profile_names):
+    pr_body = os.getenv('PR_BODY') or ''
+
+    # VERIFY_PROFILES évalue plusieurs profils avec la même liste de fichiers
+    profile_names = (os.getenv('VERIFY_PROFILES') or ','.join(profile_names)).split(',')
+    unknown = [name for name in profile_names if name not in POLICY_PROFILES]
+    if unknown:
+        print(f"Error: Unknown policy profiles: {unknown}")
+        sys.exit(1)
+
+    report_all = os.getenv('REPORT_ALL_FILES', '').lower() in ('1', 'true')
+
+    pr_extensions = get_accepted_extensions(pr_body)
+    profiles = {
+        name: compile_extensions(pr_extensions + POLICY_PROFILES[name])
+        for name in profile_names
+    }
+
+    source, changed_files = get_change_source()
+    count, rejected, refused = check_files(changed_files, profiles, report_all)
+    print(f"changed files checked : {count} (source: {source})")
+
+    if count == 0:
+        print("Error: No changed files detected.")
+        sys.exit(1)
+
+    for name in profile_names:
+        if not rejected[name]:
+            print(f"[{name}] All changed files have accepted extensions.")
+        else:
+            print(f"[{name}] Some changed files do not have accepted extensions:")
+            for file in rejected[name]:
+                print(f"- {file}")
+
+    # Verdict combiné: chaque fichier doit être accepté par au moins un profil
+    if not refused:
+        print(f"All changed files are accepted by {', '.join(profile_names)}.")
+        sys.exit(0)
+    print(f"Changed files accepted by none of {', '.join(profile_names)}:")
+    for file in refused:
+        print(f"- {file}")
+    sys.exit(1)
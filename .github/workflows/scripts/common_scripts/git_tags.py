@@ -0,0 +1,166 @@
+import argparse
+import os
+import sys
+import tempfile
+
+from process_runner import run
+from release_pipeline import Stage, run_pipeline
+
+
+def _git(*args):
+    # Output of a git command, without printing it
+    return run(['git', *args], on_line=lambda line, is_stderr: None).stdout
+
+
+def get_remote_tags(remote, tags):
+    # Returns {tag: commit} for the tags that exist on the remote, in one call.
+    # An annotated tag is compared by the commit it points to, from its peeled
+    # line (tag^{}): the tag object changes each time the tag is re-created.
+    if not tags:
+        return {}
+    listing = _git('ls-remote', '--tags', remote,
+                   *[ref for tag in tags for ref in (f"refs/tags/{tag}", f"refs/tags/{tag}^{{}}")])
+    existing = {}
+    for line in listing.splitlines():
+        if not line.strip():
+            continue
+        object_id, ref = line.split()
+        tag = ref[len('refs/tags/'):]
+        if tag.endswith('^{}'):
+            existing[tag[:-len('^{}')]] = object_id
+        else:
+            existing.setdefault(tag, object_id)
+    return existing
+
+
+def get_tag_commit(tag):
+    # Commit of a local tag, None when the tag does not exist
+    result = run(['git', 'rev-parse', '--verify', '--quiet', f"refs/tags/{tag}^{{commit}}"],
+                 check=False, on_line=lambda line, is_stderr: None)
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def get_tags_to_push(remote, tags):
+    # Split the tags into the ones to push and the ones already on the remote
+    # on the same commit. A tag on the remote on another commit raises
+    # ValueError: it was not created by this release.
+    existing = get_remote_tags(remote, tags)
+    conflicts = [tag for tag in existing if existing[tag] != get_tag_commit(tag)]
+    if conflicts:
+        raise ValueError(f"Tags already on {remote} with another target: {conflicts}")
+    return [tag for tag in tags if tag not in existing], [tag for tag in tags if tag in existing]
+
+
+def create_tags(remote, tags):
+    # Create the annotated tags on HEAD, nothing reaches the remote yet. A tag
+    # left on HEAD by a previous attempt of the release is reused, fetched when
+    # it is only on the remote. A tag on another commit, locally or on the
+    # remote, raises ValueError: it was not created by this release.
+    head = _git('rev-parse', 'HEAD').strip()
+    remote_tags = get_remote_tags(remote, tags)
+    local_tags = {tag: get_tag_commit(tag) for tag in tags}
+    conflicts = [tag for tag in tags if {remote_tags.get(tag), local_tags[tag]} - {None, head}]
+    if conflicts:
+        raise ValueError(f"Tags already exist on another commit: {conflicts}")
+    fetch = [tag for tag in tags if tag in remote_tags and not local_tags[tag]]
+    if fetch:
+        print(f"Tags already on {remote}: {fetch}")
+        _git('fetch', remote, *[f"refs/tags/{tag}:refs/tags/{tag}" for tag in fetch])
+    for tag in tags:
+        if local_tags[tag]:
+            print(f"Tag {tag} already exists")
+        elif tag not in remote_tags:
+            print(f"Creating tag {tag}")
+            _git('tag', '-a', tag, '-m', f"Release {tag}")
+
+
+def _clone(remote, folder, name):
+    # actions/checkout does not fetch the tags either
+    clone = os.path.join(folder, name)
+    _git('clone', '--no-tags', remote, clone)
+    os.chdir(clone)
+
+
+def check():
+    # Run the release of two tags again against a scratch remote, once the
+    # tags are pushed: from the same checkout, from a fresh one re-creating the
+    # tags or fetching them, from a checkout on another commit, and resumed
+    # by the release pipeline
+    tags = ['Lionk.Core_1.0.0', 'Lionk.Utils_1.0.0']
+    for variable in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        os.environ.setdefault(variable, 'lionk-workflows')
+    for variable in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        os.environ.setdefault(variable, 'lionk-workflows@localhost')
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as folder:
+        remote = os.path.join(folder, 'remote.git')
+        _git('init', '--bare', remote)
+        try:
+            _clone(remote, folder, 'first')
+            _git('commit', '--allow-empty', '-m', 'Update project versions')
+            _git('push', 'origin', 'HEAD')
+            create_tags('origin', tags)
+            assert get_tags_to_push('origin', tags) == (tags, [])
+            _git('push', '--atomic', 'origin', *[f"refs/tags/{tag}" for tag in tags])
+            create_tags('origin', tags)
+            assert get_tags_to_push('origin', tags) == ([], tags)
+
+            # Another date gives another tag object on the same commit
+            _clone(remote, folder, 'recreated')
+            os.environ['GIT_COMMITTER_DATE'] = '2024-01-02T00:00:00'
+            for tag in tags:
+                _git('tag', '-a', tag, '-m', f"Release {tag}")
+            assert get_tags_to_push('origin', tags) == ([], tags)
+
+            _clone(remote, folder, 'fetched')
+            create_tags('origin', tags)
+            assert all(get_tag_commit(tag) == _git('rev-parse', 'HEAD').strip() for tag in tags)
+            assert get_tags_to_push('origin', tags) == ([], tags)
+
+            _clone(remote, folder, 'moved')
+            _git('commit', '--allow-empty', '-m', 'Update project versions')
+            try:
+                create_tags('origin', tags)
+                raise AssertionError("Tags on another commit were accepted")
+            except ValueError:
+                pass
+
+            # The release stage fails after the tag push and is kept, then resumed
+            # from a fresh checkout with the checkpoint
+            tags = ['Lionk.Core_1.1.0', 'Lionk.Utils_1.1.0']
+            checkpoint = os.path.join(folder, 'release_checkpoint.json')
+            attempts = []
+
+            def publish_release():
+                attempts.append(os.getcwd())
+                create_tags('origin', tags)
+                to_push, _ = get_tags_to_push('origin', tags)
+                if to_push:
+                    _git('push', '--atomic', 'origin', *[f"refs/tags/{tag}" for tag in to_push])
+                if len(attempts) == 1:
+                    sys.exit("GitHub API error 502")
+
+            stages = [Stage('update_csproj', [lambda: _git('push', 'origin', 'HEAD')]),
+                      Stage('publish_release', [publish_release])]
+            _git('reset', '--hard', 'origin/HEAD')
+            _git('commit', '--allow-empty', '-m', 'Update project versions')
+            assert not run_pipeline('nuget', stages, on_failure='keep', path=checkpoint)
+            _clone(remote, folder, 'resumed')
+            assert run_pipeline('nuget', stages, resume=True, on_failure='keep', path=checkpoint)
+            assert len(attempts) == 2 and get_tags_to_push('origin', tags) == ([], tags)
+        finally:
+            os.chdir(cwd)
+            os.environ.pop('GIT_COMMITTER_DATE', None)
+    print("Tags of a release run again are reused")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Release tags self-check")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('check', help="release tags again against a scratch remote")
+    parser.parse_args()
+    check()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
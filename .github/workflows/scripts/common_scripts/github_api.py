@@ -0,0 +1,209 @@
+import atexit
+import http.client
+import json
+import os
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit, urlencode
+
+DEFAULT_API_URL = 'https://api.github.com'
+
+# ETags and bodies of previous GET responses, a 304 answer does not count
+# against the rate limit so repeated runs are almost free
+ETAG_CACHE_FILE = os.getenv('GITHUB_ETAG_CACHE', '.github_etag_cache.json')
+
+# Never sleep longer than this waiting for a rate limit reset
+MAX_RATE_LIMIT_WAIT = 300
+
+LINK_NEXT_PATTERN = re.compile(r'<([^>]+)>;\s*rel="next"')
+
+# Statuses worth retrying: rate limited or server side failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GitHubError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"GitHub API error {status}: {message}")
+        self.status = status
+
+
+@dataclass
+class GitHubResponse:
+    status: int
+    headers: dict
+    body: bytes
+
+    def json(self):
+        return json.loads(self.body) if self.body else None
+
+
+class GitHubClient:
+    # Small GitHub REST client keeping its connections alive between requests.
+    # Connections are pooled so the client can be shared by worker threads.
+
+    def __init__(self, token, api_url=DEFAULT_API_URL, max_connections=8, retries=3, backoff=0.5,
+                 etag_cache_file=ETAG_CACHE_FILE):
+        parts = urlsplit(api_url)
+        self.scheme = parts.scheme
+        self.host = parts.netloc
+        self.base_path = parts.path.rstrip('/')
+        self.token = token
+        self.retries = retries
+        self.backoff = backoff
+        self._pool = queue.LifoQueue(maxsize=max_connections)
+        self._lock = threading.Lock()
+        self._rate_limit_reset = 0
+        self._etag_cache_file = etag_cache_file
+        self._etag_cache = self._load_etag_cache()
+        self._etag_dirty = False
+        atexit.register(self.save_etag_cache)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.save_etag_cache()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _load_etag_cache(self):
+        if not self._etag_cache_file:
+            return {}
+        try:
+            with open(self._etag_cache_file, 'r') as file:
+                return json.load(file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_etag_cache(self):
+        with self._lock:
+            if not self._etag_cache_file or not self._etag_dirty:
+                return
+            with open(self._etag_cache_file, 'w') as file:
+                json.dump(self._etag_cache, file)
+            self._etag_dirty = False
+
+    def _get_connection(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            if self.scheme == 'http':
+                return http.client.HTTPConnection(self.host, timeout=30)
+            return http.client.HTTPSConnection(self.host, timeout=30)
+
+    def _release_connection(self, connection):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def _url(self, path, params):
+        # path is either relative to the api url or an absolute url (e.g. a Link header)
+        if '://' in path:
+            parts = urlsplit(path)
+            url = parts.path + (f"?{parts.query}" if parts.query else '')
+        else:
+            url = self.base_path + path
+        if params:
+            url += ('&' if '?' in url else '?') + urlencode(params)
+        return url
+
+    def _wait_for_rate_limit(self):
+        delay = self._rate_limit_reset - time.time()
+        if delay > 0:
+            print(f"GitHub API rate limit reached, waiting {delay:.0f}s")
+            time.sleep(min(delay, MAX_RATE_LIMIT_WAIT))
+
+    def _update_rate_limit(self, status, headers):
+        # Returns True when the request was rejected because of the rate limit
+        reset_at = 0
+        if headers.get('x-ratelimit-remaining') == '0' and 'x-ratelimit-reset' in headers:
+            reset_at = int(headers['x-ratelimit-reset']) + 1
+        if 'retry-after' in headers and status in (403, 429):
+            reset_at = time.time() + int(headers['retry-after'])
+        if reset_at:
+            with self._lock:
+                self._rate_limit_reset = max(self._rate_limit_reset, reset_at)
+        return reset_at and status in (403, 429)
+
+    def request(self, method, path, params=None, headers=None, body=None):
+        # body is sent as json when given
+        url = self._url(path, params)
+        request_headers = {
+            'Accept': 'application/vnd.github.v3+json',
+            'User-Agent': 'lionk-workflows',
+        }
+        if self.token:
+            request_headers['Authorization'] = f"token {self.token}"
+        if body is not None:
+            body = json.dumps(body).encode()
+            request_headers['Content-Type'] = 'application/json'
+        if headers:
+            request_headers.update(headers)
+
+        cached = self._etag_cache.get(url) if method == 'GET' else None
+        if cached:
+            request_headers['If-None-Match'] = cached['etag']
+
+        for attempt in range(self.retries + 1):
+            self._wait_for_rate_limit()
+            connection = self._get_connection()
+            try:
+                connection.request(method, url, body=body, headers=request_headers)
+                response = connection.getresponse()
+                response_body = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                if attempt == self.retries:
+                    raise GitHubError(None, f"{method} {url} failed: {e}")
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            self._release_connection(connection)
+            headers = {name.lower(): value for name, value in response.getheaders()}
+            if self._update_rate_limit(response.status, headers) and attempt < self.retries:
+                continue
+            if response.status in RETRY_STATUSES and attempt < self.retries:
+                time.sleep(self.backoff * 2 ** attempt)
+                continue
+
+            if response.status == 304 and cached:
+                return GitHubResponse(200, dict(cached['headers'], **headers), cached['body'].encode())
+            if method == 'GET' and response.status == 200 and 'etag' in headers:
+                with self._lock:
+                    self._etag_cache[url] = {
+                        'etag': headers['etag'],
+                        'headers': {'link': headers['link']} if 'link' in headers else {},
+                        'body': response_body.decode(),
+                    }
+                    self._etag_dirty = True
+            return GitHubResponse(response.status, headers, response_body)
+
+    def get_json(self, path, params=None):
+        response = self.request('GET', path, params=params)
+        if response.status >= 400:
+            raise GitHubError(response.status, response.body.decode(errors='replace'))
+        return response.json()
+
+    def paginate(self, path, params=None):
+        # Yield the items of a paginated listing, one page at a time, following
+        # the Link headers
+        params = dict(params or {})
+        params.setdefault('per_page', 100)
+        while path:
+            response = self.request('GET', path, params=params)
+            if response.status >= 400:
+                raise GitHubError(response.status, response.body.decode(errors='replace'))
+            yield from response.json()
+            match = LINK_NEXT_PATTERN.search(response.headers.get('link', ''))
+            # the next link already carries the query parameters
+            path, params = (match.group(1), None) if match else (None, None)
@@ -0,0 +1,111 @@
+import argparse
+import base64
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Versions already published on a NuGet feed. HTTP feeds are read through the
+# flat container (PackageBaseAddress) of their v3 service index, local folder
+# feeds through their file names, flat ({id}.{version}.nupkg) or hierarchical
+# ({id}/{version}/). Versions are compared in lower case, as NuGet does.
+
+
+class FeedError(Exception):
+    pass
+
+
+def is_local_feed(source):
+    return '://' not in source or source.startswith('file://')
+
+
+def _request_json(url, api_key=None):
+    # Returns None on 404
+    headers = {'Accept': 'application/json', 'User-Agent': 'lionk-workflows'}
+    if api_key:
+        # GitHub Packages reads the token as the password of basic auth
+        headers['Authorization'] = 'Basic ' + base64.b64encode(f"token:{api_key}".encode()).decode()
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        if e.code == 404:
+            return None
+        raise FeedError(f"GET {url} failed: {e.code} {e.reason}")
+    except (OSError, ValueError) as e:
+        raise FeedError(f"GET {url} failed: {e}")
+
+
+def get_package_base_address(source, api_key=None):
+    index = _request_json(source, api_key)
+    if index is None:
+        raise FeedError(f"No service index at {source}")
+    for resource in index.get('resources', []):
+        types = resource.get('@type', [])
+        types = [types] if isinstance(types, str) else types
+        if any(type.startswith('PackageBaseAddress/3.0.0') for type in types):
+            return resource['@id'].rstrip('/') + '/'
+    raise FeedError(f"No PackageBaseAddress resource in the service index of {source}")
+
+
+def _get_http_versions(base_address, package, api_key):
+    index = _request_json(f"{base_address}{package.lower()}/index.json", api_key)
+    return {version.lower() for version in index.get('versions', [])} if index else set()
+
+
+def _get_local_versions(folder, names, package):
+    package = package.lower()
+    versions = set()
+    for name in names:
+        name = name.lower()
+        # Lionk.Core.Razor.1.0.0.nupkg also starts with lionk.core.
+        if name.startswith(f"{package}.") and name.endswith('.nupkg'):
+            version = name[len(package) + 1:-len('.nupkg')]
+            if version[:1].isdigit():
+                versions.add(version)
+        elif name == package and os.path.isdir(os.path.join(folder, name)):
+            versions.update(version.lower() for version in os.listdir(os.path.join(folder, name)))
+    return versions
+
+
+def get_published_versions(source, packages, api_key=None, workers=None):
+    # Returns {package: versions} for every package, the package indexes of an
+    # HTTP feed are requested concurrently
+    if is_local_feed(source):
+        folder = source[len('file://'):] if source.startswith('file://') else source
+        names = os.listdir(folder) if os.path.isdir(folder) else []
+        return {package: _get_local_versions(folder, names, package) for package in packages}
+
+    base_address = get_package_base_address(source, api_key)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        versions = pool.map(lambda package: _get_http_versions(base_address, package, api_key), packages)
+        return dict(zip(packages, versions))
+
+
+def get_missing(source, releases, api_key=None, workers=None):
+    # Split (package, version) pairs into the ones to push and the ones already published
+    published = get_published_versions(source, [name for name, _ in releases], api_key, workers)
+    missing = [(name, version) for name, version in releases if version.lower() not in published[name]]
+    present = [(name, version) for name, version in releases if version.lower() in published[name]]
+    return missing, present
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the versions of packages published on a NuGet feed")
+    parser.add_argument('source', help="v3 service index url or local folder")
+    parser.add_argument('packages', nargs='+')
+    args = parser.parse_args()
+
+    try:
+        published = get_published_versions(args.source, args.packages, os.getenv('NUGET_API_KEY'))
+    except FeedError as e:
+        print(e)
+        return 1
+    for package, versions in published.items():
+        print(f"{package}: {', '.join(sorted(versions)) or '-'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
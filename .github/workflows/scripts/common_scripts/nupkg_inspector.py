@@ -0,0 +1,102 @@
+import argparse
+import os
+import sys
+import xml.etree.ElementTree as ET
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from release_manifest import read_manifest
+
+# Checks run on a packed nupkg before it is pushed. The package is read in
+# place: only the central directory and the .nuspec entry are loaded.
+
+
+def get_package_path(output_dir, release):
+    return os.path.join(output_dir, f"{release.name}.{release.newversion}.nupkg")
+
+
+def get_release_notes(changelog):
+    # Same text as the PackageReleaseNotes written by process_csproj
+    return ''.join(f"- {change}\n" for change in changelog)
+
+
+def _normalize(text):
+    return '\n'.join(line.rstrip() for line in (text or '').strip().splitlines())
+
+
+def read_nuspec(nupkg):
+    # Parse the .nuspec at the root of an open package, returns (name, metadata)
+    nuspecs = [name for name in nupkg.namelist() if '/' not in name and name.endswith('.nuspec')]
+    if len(nuspecs) != 1:
+        raise ValueError(f"Expected one .nuspec at the package root, found {nuspecs}")
+    with nupkg.open(nuspecs[0]) as file:
+        root = ET.parse(file).getroot()
+    # The nuspec namespace depends on the version of the SDK that packed it
+    metadata = root.find('{*}metadata')
+    if metadata is None:
+        raise ValueError(f"No <metadata> in {nuspecs[0]}")
+    return nuspecs[0], {child.tag.split('}')[-1]: child.text for child in metadata}
+
+
+def inspect_package(path, release, readme_expected=False):
+    # Returns the problems of the package, an empty list when it can be pushed
+    try:
+        with zipfile.ZipFile(path) as nupkg:
+            nuspec, metadata = read_nuspec(nupkg)
+            entries = set(nupkg.namelist())
+    except FileNotFoundError:
+        return [f"Package {path} not found"]
+    except (zipfile.BadZipFile, ET.ParseError, ValueError) as e:
+        return [f"Invalid package {path}: {e}"]
+
+    problems = []
+    if (metadata.get('id') or '').lower() != release.name.lower():
+        problems.append(f"Package id {metadata.get('id')} in {nuspec}, expected {release.name}")
+    if metadata.get('version') != release.newversion:
+        problems.append(f"Version {metadata.get('version')} in {nuspec}, expected {release.newversion}")
+    if _normalize(metadata.get('releaseNotes')) != _normalize(get_release_notes(release.changelog)):
+        problems.append(f"Release notes of {nuspec} do not match the changelog of the release")
+
+    readme = metadata.get('readme')
+    if readme:
+        if readme.replace('\\', '/') not in entries:
+            problems.append(f"Readme {readme} declared in {nuspec} is not in the package")
+    elif readme_expected:
+        problems.append(f"No readme in {nuspec}")
+    return problems
+
+
+def inspect_packages(releases, output_dir, lib_path=None, workers=None):
+    # Inspect the packages of the releases concurrently, returns {project: problems}.
+    # A readme is expected when the project has one, as process_csproj packs it.
+    def inspect(release):
+        readme_expected = bool(lib_path) and os.path.exists(os.path.join(lib_path, release.name, 'README.md'))
+        return inspect_package(get_package_path(output_dir, release), release, readme_expected)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return dict(zip([release.name for release in releases], pool.map(inspect, releases)))
+
+
+def print_report(results):
+    # Returns True when every package passed
+    for project, problems in results.items():
+        if problems:
+            for problem in problems:
+                print(f"{project}: {problem}")
+        else:
+            print(f"{project}: OK")
+    return not any(results.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the packed nupkg files against the release manifest")
+    parser.add_argument('--output', default='./output', help="folder of the nupkg files")
+    parser.add_argument('--lib-path', default=os.getenv('LIB_PATH'))
+    args = parser.parse_args()
+
+    if not print_report(inspect_packages(read_manifest().projects, args.output, args.lib_path)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import argparse
+import io
+import random
+import string
+import sys
+import time
+from dataclasses import dataclass, field
+
+from release_manifest import VERSION_TYPES
+
+# Release pull requests:
+#   title  "nuget: Lionk.Core minor, Lionk.Utils patch" or "app: minor"
+#   body   project names each followed by their "- change" lines, lines
+#          starting with // are comments. App bodies have no project names.
+
+
+@dataclass
+class Diagnostic:
+    line: int
+    message: str
+    severity: str = 'error'
+
+    def __str__(self):
+        location = f"line {self.line}: " if self.line else ''
+        return f"{self.severity}: {location}{self.message}"
+
+
+@dataclass
+class ParsedBody:
+    changelogs: dict = field(default_factory=dict)
+    diagnostics: list = field(default_factory=list)
+
+    @property
+    def errors(self):
+        return [d for d in self.diagnostics if d.severity == 'error']
+
+
+def _lines(source):
+    # Read a string or any iterable of lines without splitting it up front
+    return io.StringIO(source) if isinstance(source, str) else source
+
+
+def tokenize(source):
+    # Yield (line number, kind, value) with kind 'item' or 'project',
+    # skipping blank lines and comments
+    for number, line in enumerate(_lines(source), 1):
+        line = line.strip()
+        if not line or line.startswith('//'):
+            continue
+        if line.startswith('-'):
+            yield number, 'item', line.lstrip('-').strip()
+        else:
+            yield number, 'project', line
+
+
+def parse_body(source, projects=None):
+    # Map the changelog items of the body to their project in one pass.
+    # Without projects (app bodies) every item goes to the None key and the
+    # other lines are ignored. Problems are collected, never raised.
+    result = ParsedBody()
+    if projects is None:
+        items = result.changelogs.setdefault(None, [])
+        for number, kind, value in tokenize(source):
+            if kind == 'item':
+                if value:
+                    items.append(value)
+                else:
+                    result.diagnostics.append(Diagnostic(number, "Empty changelog item", 'warning'))
+        return result
+
+    # Headers may be written with spaces ("Lionk. Core")
+    lookup = {project.replace(' ', ''): project for project in projects}
+    current = None
+    unknown = False
+    for number, kind, value in tokenize(source):
+        if kind == 'project':
+            current = lookup.get(value.replace(' ', ''))
+            unknown = current is None
+            if unknown:
+                result.diagnostics.append(Diagnostic(number, f"Project {value} not found in the PR title"))
+            else:
+                result.changelogs.setdefault(current, [])
+        elif unknown:
+            # Already reported with the project name
+            continue
+        elif current is None:
+            result.diagnostics.append(Diagnostic(number, f"Changelog item before any project name: {value}"))
+        elif not value:
+            result.diagnostics.append(Diagnostic(number, "Empty changelog item", 'warning'))
+        else:
+            result.changelogs[current].append(value)
+
+    for project in projects:
+        if not result.changelogs.get(project):
+            result.diagnostics.append(Diagnostic(0, f"No changelog for {project}", 'warning'))
+    return result
+
+
+def parse_nuget_title(title):
+    # Returns ([(project, type)], diagnostics)
+    entries = []
+    diagnostics = []
+    seen = set()
+    for part in title.replace('nuget:', '', 1).split(','):
+        parts = part.split()
+        if len(parts) != 2:
+            diagnostics.append(Diagnostic(0, f"Invalid part of pull request title: {part.strip()}"))
+            continue
+        project, type = parts[0], parts[1].lower()
+        if type not in VERSION_TYPES:
+            diagnostics.append(Diagnostic(0, f"Invalid version type for {project}: {type}"))
+            continue
+        if project in seen:
+            diagnostics.append(Diagnostic(0, f"Project {project} appears twice in the title"))
+            continue
+        seen.add(project)
+        entries.append((project, type))
+    return entries, diagnostics
+
+
+def parse_app_title(title):
+    # Returns (type, diagnostics)
+    type = title.replace('app:', '', 1).lower().strip()
+    if type not in VERSION_TYPES:
+        return None, [Diagnostic(0, f"Invalid version type: {type}")]
+    return type, []
+
+
+def print_diagnostics(diagnostics):
+    for diagnostic in diagnostics:
+        print(diagnostic)
+
+
+def generate_body(size, projects, seed=0, noise=0.0):
+    # Synthetic body of about size bytes, noise is the share of random lines
+    rng = random.Random(seed)
+    lines = []
+    length = 0
+    while length < size:
+        roll = rng.random()
+        if roll < noise:
+            line = ''.join(rng.choice(string.printable) for _ in range(rng.randint(0, 80)))
+        elif roll < noise + 0.05:
+            line = rng.choice(projects)
+        elif roll < noise + 0.07:
+            line = '// comment'
+        else:
+            line = '- ' + ' '.join(rng.choice(('fix', 'add', 'remove', 'update', 'the', 'cache', 'graph'))
+                                   for _ in range(rng.randint(1, 12)))
+        lines.append(line)
+        length += len(line) + 1
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Release PR body parser benchmark and fuzzing")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    benchmark_parser = subparsers.add_parser('benchmark', help="time the parser on a generated body")
+    benchmark_parser.add_argument('--size-mb', type=float, default=8)
+    fuzz_parser = subparsers.add_parser('fuzz', help="parse random bodies and check the invariants")
+    fuzz_parser.add_argument('--runs', type=int, default=200)
+    fuzz_parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    projects = [f"Lionk.Project{i}" for i in range(20)]
+
+    if args.command == 'benchmark':
+        body = generate_body(int(args.size_mb * 1024 * 1024), projects)
+        start = time.perf_counter()
+        result = parse_body(body, projects)
+        seconds = time.perf_counter() - start
+        items = sum(len(changes) for changes in result.changelogs.values())
+        print(f"{len(body) / 1024 / 1024:.1f} MB, {items} items, {len(result.diagnostics)} diagnostics "
+              f"in {seconds:.2f}s ({len(body) / 1024 / 1024 / seconds:.1f} MB/s)")
+        return
+
+    rng = random.Random(args.seed)
+    for run in range(args.runs):
+        body = generate_body(rng.randint(0, 20000), projects, seed=rng.random(), noise=rng.random())
+        line_count = body.count('\n') + 1
+        result = parse_body(body, projects)
+        assert set(result.changelogs) <= set(projects), run
+        assert all(0 <= d.line <= line_count for d in result.diagnostics), run
+        assert all(change for changes in result.changelogs.values() for change in changes), run
+        assert parse_body(io.StringIO(body), projects) == result, run
+    print(f"{args.runs} random bodies parsed")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
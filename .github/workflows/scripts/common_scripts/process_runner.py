@@ -0,0 +1,139 @@
+import asyncio
+import contextlib
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+
+from step_metrics import record_step
+
+# Every command output is also written to a log file in LOG_DIR when set
+LOG_DIR = os.getenv('LOG_DIR')
+# Default timeout of a command, in seconds
+COMMAND_TIMEOUT = float(os.getenv('COMMAND_TIMEOUT', 0)) or None
+
+
+class CommandError(Exception):
+    def __init__(self, command, result):
+        super().__init__(f"Error running command {command}: exit code {result.returncode}")
+        self.command = command
+        self.result = result
+
+
+class CommandTimeout(Exception):
+    def __init__(self, command, timeout):
+        super().__init__(f"Command {command} timed out after {timeout}s")
+        self.command = command
+
+
+@dataclass
+class CommandResult:
+    returncode: int
+    stdout: str
+    stderr: str
+    seconds: float
+
+
+def _log_path(command, name):
+    label = re.sub(r'[^\w.-]+', '_', name or ' '.join(command[:3]))
+    return os.path.join(LOG_DIR, f"{label}-{os.getpid()}-{time.monotonic_ns()}.log")
+
+
+async def run_async(command, name=None, timeout=COMMAND_TIMEOUT, check=True, on_line=None,
+                    step=None, project=None, log_file=None, cwd=None):
+    # Run a command, printing stdout and stderr line by line as they arrive,
+    # prefixed by name when given. on_line(line, is_stderr) replaces printing.
+    # With step and project, the run is recorded in the step metrics.
+    loop = asyncio.get_running_loop()
+    if log_file is None and LOG_DIR:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        log_file = _log_path(command, name)
+    log = open(log_file, 'a') if log_file else None
+    prefix = f"[{name}] " if name else ''
+    outputs = {'stdout': [], 'stderr': []}
+
+    started_at = time.time()
+    start = time.monotonic()
+    # Popen + wait4 rather than asyncio's own subprocess support, which reaps the
+    # child itself and loses its resource usage
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd)
+
+    async def pump(pipe, label):
+        reader = asyncio.StreamReader()
+        transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), pipe)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                line = line.decode(errors='replace')
+                outputs[label].append(line)
+                if log:
+                    log.write(line)
+                if on_line:
+                    on_line(line, label == 'stderr')
+                else:
+                    print(prefix + line, end='', file=sys.stderr if label == 'stderr' else sys.stdout, flush=True)
+        finally:
+            transport.close()
+
+    wait = asyncio.ensure_future(asyncio.to_thread(os.wait4, process.pid, 0))
+    pumps = asyncio.gather(pump(process.stdout, 'stdout'), pump(process.stderr, 'stderr'))
+    done = asyncio.gather(pumps, wait)
+    try:
+        await asyncio.wait_for(asyncio.shield(done), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await wait
+        # Grandchildren may still hold the pipes open
+        pumps.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await done
+        raise CommandTimeout(command, timeout)
+    finally:
+        if log:
+            log.close()
+
+    _, status, usage = wait.result()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    result = CommandResult(process.returncode, ''.join(outputs['stdout']), ''.join(outputs['stderr']),
+                           time.monotonic() - start)
+    if step and project:
+        record_step(project, step, started_at, result.seconds, usage.ru_utime + usage.ru_stime,
+                    usage.ru_maxrss, result.returncode)
+    if check and result.returncode != 0:
+        raise CommandError(command, result)
+    return result
+
+
+def run(command, **kwargs):
+    return asyncio.run(run_async(command, **kwargs))
+
+
+async def _run_all(commands, limit):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run_one(command, kwargs):
+        async with semaphore:
+            return await run_async(command, **kwargs)
+
+    return await asyncio.gather(*(run_one(command, kwargs) for command, kwargs in commands),
+                                return_exceptions=True)
+
+
+def run_all(commands, limit=4):
+    # Run independent commands concurrently, at most limit at a time.
+    # commands is a list of (command, kwargs of run_async); results are returned
+    # in the same order, a failed command gives its exception instead of a result.
+    return asyncio.run(_run_all(commands, limit))
+
+
+def run_command(command, **kwargs):
+    # Same contract as the former per-script helpers: stop the step on failure
+    try:
+        return run(command, **kwargs)
+    except (CommandError, CommandTimeout, OSError) as e:
+        print(e)
+        sys.exit(1)
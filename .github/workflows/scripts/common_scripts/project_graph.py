@@ -0,0 +1,62 @@
+import os
+
+from csproj_model import load_csproj
+
+
+def load_project_graph(lib_path):
+    # Build the ProjectReference graph of every {project}/{project}.csproj under lib_path
+    graph = {}
+    for project in sorted(os.listdir(lib_path)):
+        csproj_file = os.path.join(lib_path, project, f"{project}.csproj")
+        if os.path.isfile(csproj_file):
+            graph[project] = load_csproj(csproj_file).project_references
+    return graph
+
+
+def get_release_dependencies(graph, projects):
+    # Restrict the graph to the released projects, following references transitively
+    # so that A -> B -> C still orders A after C when B is not released
+    dependencies = {}
+    for project in projects:
+        found = set()
+        stack = list(graph.get(project, []))
+        while stack:
+            reference = stack.pop()
+            if reference in found:
+                continue
+            found.add(reference)
+            stack.extend(graph.get(reference, []))
+        dependencies[project] = [p for p in projects if p in found]
+    return dependencies
+
+
+def get_closures(graph, projects):
+    # Every project built by the build of each project: itself and all its
+    # references, released or not
+    closures = {}
+    for project in projects:
+        found = {project}
+        stack = list(graph.get(project, []))
+        while stack:
+            reference = stack.pop()
+            if reference not in found:
+                found.add(reference)
+                stack.extend(graph.get(reference, []))
+        closures[project] = found
+    return closures
+
+
+def get_tiers(dependencies):
+    # Group projects into tiers: every project only depends on projects of previous tiers
+    remaining = dict(dependencies)
+    done = set()
+    tiers = []
+    while remaining:
+        tier = [p for p, deps in remaining.items() if all(d in done for d in deps)]
+        if not tier:
+            raise ValueError(f"Cycle detected between projects: {sorted(remaining)}")
+        tiers.append(tier)
+        done.update(tier)
+        for project in tier:
+            del remaining[project]
+    return tiers
@@ -0,0 +1,48 @@
+import glob
+import json
+import os
+import threading
+import time
+
+# Every job appends the side effects it is about to perform to its own file,
+# the workflows carry the directory from job to job as an artifact
+JOURNAL_DIR = os.getenv('RELEASE_JOURNAL_DIR', 'release_journal')
+
+ACTIONS = ('csproj_commit', 'nuget_push', 'tag_push', 'release_create')
+
+_lock = threading.Lock()
+_sequence = 0
+
+
+def get_journal_file(journal_dir=JOURNAL_DIR):
+    return os.path.join(journal_dir, f"{os.getenv('GITHUB_JOB', 'local')}.jsonl")
+
+
+def record(action, journal_dir=JOURNAL_DIR, **args):
+    # Write-ahead: the entry is on disk before the action starts, so an entry
+    # may describe an action that never happened and undoing it must be a no-op
+    global _sequence
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown journal action {action}")
+    with _lock:
+        _sequence += 1
+        entry = {'time': time.time(), 'sequence': _sequence, 'action': action, 'args': args}
+        os.makedirs(journal_dir, exist_ok=True)
+        with open(get_journal_file(journal_dir), 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+
+
+def load_journal(journal_dir=JOURNAL_DIR):
+    # Entries of all the jobs, oldest first. A truncated last line is the
+    # entry of a killed writer and is ignored.
+    entries = []
+    for path in glob.glob(os.path.join(journal_dir, '*.jsonl')):
+        with open(path, 'r') as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+    return sorted(entries, key=lambda entry: (entry['time'], entry['sequence']))
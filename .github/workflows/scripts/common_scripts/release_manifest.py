@@ -0,0 +1,116 @@
+import json
+import os
+import re
+import sys
+from dataclasses import dataclass, field, asdict
+
+# Single artifact shared by every step of a release, replaces projects.txt,
+# types.txt, oldversions.txt, newversions.txt and changelog.json
+MANIFEST_FILE = 'release.json'
+MANIFEST_VERSION = 1
+
+VERSION_TYPES = ['major', 'minor', 'patch']
+VERSION_PATTERN = re.compile(r'^\d+\.\d+\.\d+$')
+
+
+@dataclass
+class ReleaseProject:
+    name: str
+    type: str
+    oldversion: str
+    newversion: str
+    changelog: list = field(default_factory=list)
+
+    @property
+    def tag(self):
+        return f"{self.name}_{self.newversion}"
+
+
+@dataclass
+class ReleaseManifest:
+    projects: list
+    version: int = MANIFEST_VERSION
+
+    @property
+    def names(self):
+        return [project.name for project in self.projects]
+
+    def get(self, name):
+        for project in self.projects:
+            if project.name == name:
+                return project
+        raise KeyError(name)
+
+
+def bump_version(version, type):
+    # Raises ValueError on a version that is not major.minor.patch
+    if not VERSION_PATTERN.match(version):
+        raise ValueError(f"Invalid version: {version}")
+    major, minor, patch = map(int, version.split('.'))
+    if type == 'major':
+        return f"{major + 1}.0.0"
+    if type == 'minor':
+        return f"{major}.{minor + 1}.0"
+    if type == 'patch':
+        return f"{major}.{minor}.{patch + 1}"
+    raise ValueError(f"Invalid version type: {type}")
+
+
+def validate_manifest(manifest):
+    if manifest.version != MANIFEST_VERSION:
+        raise ValueError(f"Unsupported release manifest version: {manifest.version}")
+    if not manifest.projects:
+        raise ValueError("No projects in release manifest")
+    names = set()
+    for project in manifest.projects:
+        if project.name in names:
+            raise ValueError(f"Duplicate project in release manifest: {project.name}")
+        names.add(project.name)
+        if project.type not in VERSION_TYPES:
+            raise ValueError(f"Invalid version type for {project.name}: {project.type}")
+        if not VERSION_PATTERN.match(project.newversion):
+            raise ValueError(f"Invalid new version for {project.name}: {project.newversion}")
+        if not all(isinstance(change, str) for change in project.changelog):
+            raise ValueError(f"Invalid changelog for {project.name}")
+
+
+def write_manifest(manifest, path=MANIFEST_FILE):
+    validate_manifest(manifest)
+    with open(path, 'w') as file:
+        data = {
+            'version': manifest.version,
+            'projects': [asdict(project) for project in manifest.projects],
+        }
+        json.dump(data, file, indent=2)
+    _cache[os.path.abspath(path)] = manifest
+
+
+_cache = {}
+
+
+def load_manifest(path=MANIFEST_FILE):
+    # The manifest is read and validated once per process
+    key = os.path.abspath(path)
+    if key not in _cache:
+        with open(path, 'r') as file:
+            data = json.load(file)
+        try:
+            projects = [ReleaseProject(**project) for project in data['projects']]
+            manifest = ReleaseManifest(projects=projects, version=data['version'])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Malformed release manifest {path}: {e}")
+        validate_manifest(manifest)
+        _cache[key] = manifest
+    return _cache[key]
+
+
+def read_manifest(path=MANIFEST_FILE):
+    # Same as load_manifest but stops the step on a missing or invalid manifest
+    try:
+        return load_manifest(path)
+    except FileNotFoundError:
+        print(f"File not found: {path}")
+        sys.exit(1)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
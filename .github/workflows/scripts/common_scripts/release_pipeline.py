@@ -0,0 +1,132 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+
+from release_journal import JOURNAL_DIR
+
+# Completed stages of the current release, a failed run restarted with
+# --resume skips them
+CHECKPOINT_FILE = os.getenv('RELEASE_CHECKPOINT', 'release_checkpoint.json')
+ON_FAILURE = ('rollback', 'keep')
+
+
+@dataclass
+class Stage:
+    name: str
+    # Entry points of the scripts run by the stage, in order. A stage is the
+    # unit of resumption, so steps whose output only lives in the working tree
+    # (e.g. edited csproj files before their commit) belong to the same stage.
+    steps: list
+
+
+def get_inputs_key():
+    # A checkpoint only applies to the pull request it was taken for
+    digest = hashlib.sha256()
+    for name in ('PR_TITLE', 'PR_BODY'):
+        digest.update((os.getenv(name) or '').encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def load_checkpoint(pipeline, path=CHECKPOINT_FILE):
+    try:
+        with open(path, 'r') as file:
+            checkpoint = json.load(file)
+    except (FileNotFoundError, ValueError):
+        return []
+    if checkpoint.get('pipeline') != pipeline or checkpoint.get('inputs') != get_inputs_key():
+        print(f"Ignoring checkpoint {path}, it belongs to another release")
+        return []
+    return checkpoint.get('completed', [])
+
+
+def save_checkpoint(pipeline, completed, path=CHECKPOINT_FILE):
+    # Written to a temporary file first so that a killed run never leaves a
+    # truncated checkpoint
+    temporary = f"{path}.tmp"
+    with open(temporary, 'w') as file:
+        json.dump({'pipeline': pipeline, 'inputs': get_inputs_key(), 'completed': completed}, file, indent=2)
+    os.replace(temporary, path)
+
+
+def clear_journal():
+    for path in glob.glob(os.path.join(JOURNAL_DIR, '*.jsonl')):
+        os.remove(path)
+
+
+def run_step(step):
+    # The steps are the scripts' main functions, which stop with sys.exit.
+    # Returns None on success, or the reason of the failure.
+    try:
+        step()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            return f"{step.__module__} exited with {e.code}"
+    except Exception as e:
+        traceback.print_exc()
+        return f"{step.__module__} failed: {e}"
+    return None
+
+
+def rollback():
+    from release_rollback import main as rollback_main
+    return run_step(rollback_main)
+
+
+def run_pipeline(pipeline, stages, resume=False, on_failure='rollback', path=CHECKPOINT_FILE):
+    # Run every stage in this process, the scripts share the manifest, csproj
+    # and journal state loaded in memory. Returns True on success.
+    completed = load_checkpoint(pipeline, path) if resume else []
+    if completed:
+        print(f"Resuming {pipeline} release after {completed}")
+    else:
+        # A fresh release must not undo the steps of a previous one
+        clear_journal()
+
+    timings = {}
+    for stage in stages:
+        if stage.name in completed:
+            print(f"=== {stage.name}: already completed")
+            continue
+        print(f"=== {stage.name}", flush=True)
+        start = time.monotonic()
+        error = next((error for error in map(run_step, stage.steps) if error), None)
+        timings[stage.name] = round(time.monotonic() - start, 2)
+        if error:
+            print(f"Stage {stage.name} failed: {error}")
+            if on_failure == 'keep':
+                print(f"Checkpoint kept in {path}, run again with --resume to continue")
+                return False
+            rollback_error = rollback()
+            if rollback_error:
+                print(f"Rollback failed: {rollback_error}, checkpoint kept in {path}")
+            elif os.path.exists(path):
+                os.remove(path)
+            return False
+        completed.append(stage.name)
+        save_checkpoint(pipeline, completed, path)
+
+    print(f"Release {pipeline} completed")
+    print(json.dumps(timings, indent=2))
+    os.remove(path)
+    return True
+
+
+def main(pipeline, stages):
+    parser = argparse.ArgumentParser(description=f"Run the {pipeline} release in a single process")
+    parser.add_argument('--resume', action='store_true', default=bool(os.getenv('RELEASE_RESUME')),
+                        help="skip the stages completed by a previous run of the same release")
+    parser.add_argument('--on-failure', choices=ON_FAILURE, default=os.getenv('RELEASE_ON_FAILURE') or 'rollback',
+                        help="undo the journaled steps, or keep them to resume later (default rollback)")
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE)
+    args = parser.parse_args()
+
+    print(f"Stages: {[stage.name for stage in stages]}")
+    if not run_pipeline(pipeline, stages, args.resume, args.on_failure, args.checkpoint):
+        sys.exit(1)
@@ -0,0 +1,129 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+
+from csproj_snapshot import SnapshotError, restore_snapshot
+from git_tags import get_remote_tags
+from github_api import GitHubClient, GitHubError, DEFAULT_API_URL
+from process_runner import run, CommandError, CommandTimeout
+from release_journal import JOURNAL_DIR, load_journal
+
+PACKAGE_TYPE = 'nuget'
+
+# These undos share the local git checkout and must not overlap
+SERIAL_ACTIONS = {'csproj_commit'}
+
+
+class RollbackExecutor:
+    # Undo the journaled actions, newest first. Consecutive entries of the same
+    # action are independent and undone in parallel. Every undo checks what
+    # actually exists first, so a rollback can be run again after a failure.
+
+    def __init__(self, token, packages_api_url, api_url=DEFAULT_API_URL, workers=8):
+        self.workers = workers
+        self.packages = GitHubClient(token, packages_api_url, max_connections=workers,
+                                     etag_cache_file=None) if packages_api_url else None
+        self.github = GitHubClient(token, api_url, max_connections=workers, etag_cache_file=None)
+
+    def close(self):
+        if self.packages:
+            self.packages.close()
+        self.github.close()
+
+    def undo_csproj_commit(self, args):
+        # Put the project files back as they were recorded before the release
+        branch = args.get('branch')
+        files = restore_snapshot(args['snapshot'])
+        run(['git', 'add', *files])
+        if run(['git', 'diff', '--cached', '--quiet'], check=False).returncode == 0:
+            print(f"Project files already restored: {files}")
+            return
+        run(['git', 'commit', '-m', 'Restore project versions'])
+        run(['git', 'push', 'origin', f"HEAD:{branch}"] if branch else ['git', 'push'])
+
+    def undo_nuget_push(self, args):
+        package, version = args['package'], args['version']
+        if self.packages is None:
+            raise RuntimeError("GH_API_URL must be set to delete packages")
+        try:
+            versions = {v['name']: v['id'] for v in self.packages.paginate(f"/packages/{PACKAGE_TYPE}/{package}/versions")}
+        except GitHubError as e:
+            if e.status != 404:
+                raise
+            versions = {}
+        if version not in versions:
+            print(f"Version {version} of {package} was not published")
+            return
+        response = self.packages.request('DELETE', f"/packages/{PACKAGE_TYPE}/{package}/versions/{versions[version]}")
+        if response.status >= 400 and response.status != 404:
+            raise GitHubError(response.status, response.body.decode(errors='replace'))
+        print(f"Version {version} of {package} deleted")
+
+    def undo_tag_push(self, args):
+        remote = args.get('remote', 'origin')
+        # Only the tags pushed by the release are journaled
+        existing = get_remote_tags(remote, args['tags'])
+        if not existing:
+            print(f"Tags not on {remote}: {args['tags']}")
+            return
+        run(['git', 'push', '--atomic', '--delete', remote, *[f"refs/tags/{tag}" for tag in existing]])
+
+    def undo_release_create(self, args):
+        tag, repository = args['tag'], args['repository']
+        response = self.github.request('GET', f"/repos/{repository}/releases/tags/{tag}")
+        if response.status == 404:
+            print(f"No release for {tag}")
+            return
+        if response.status >= 400:
+            raise GitHubError(response.status, response.body.decode(errors='replace'))
+        response = self.github.request('DELETE', f"/repos/{repository}/releases/{response.json()['id']}")
+        if response.status >= 400 and response.status != 404:
+            raise GitHubError(response.status, response.body.decode(errors='replace'))
+        print(f"Release {tag} deleted")
+
+    def undo(self, entry):
+        # Returns None on success, or the error message
+        try:
+            getattr(self, f"undo_{entry['action']}")(entry['args'])
+        except (CommandError, CommandTimeout, GitHubError, SnapshotError, RuntimeError, OSError) as e:
+            return f"{entry['action']} {entry['args']}: {e}"
+        return None
+
+    def rollback(self, entries):
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for action, group in groupby(reversed(entries), key=lambda entry: entry['action']):
+                group = list(group)
+                print(f"Undoing {len(group)} {action}")
+                results = map(self.undo, group) if action in SERIAL_ACTIONS else pool.map(self.undo, group)
+                errors += [error for error in results if error]
+        return errors
+
+
+def main():
+    token = os.getenv('GITHUB_TOKEN') or os.getenv('GH_TOKEN')
+    bot_name = os.getenv('BOT_NAME')
+    bot_email = os.getenv('BOT_MAIL')
+    workers = int(os.getenv('ROLLBACK_WORKERS', 8))
+
+    entries = load_journal()
+    if not entries:
+        print(f"Nothing to roll back, the journal in {JOURNAL_DIR} is empty")
+        return
+
+    if bot_name and bot_email:
+        run(['git', 'config', '--global', 'user.name', bot_name])
+        run(['git', 'config', '--global', 'user.email', bot_email])
+
+    executor = RollbackExecutor(token, os.getenv('GH_API_URL'),
+                                os.getenv('GITHUB_API_URL', DEFAULT_API_URL), workers)
+    try:
+        errors = executor.rollback(entries)
+    finally:
+        executor.close()
+
+    for error in errors:
+        print(f"Rollback error: {error}")
+    if errors:
+        sys.exit(1)
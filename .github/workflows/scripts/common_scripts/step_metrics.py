@@ -0,0 +1,130 @@
+import argparse
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import threading
+
+# Local history of the pipeline steps, restored between runs by the workflows
+METRICS_DB = os.getenv('METRICS_DB', 'pipeline_metrics.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS steps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    commit_sha TEXT NOT NULL,
+    project TEXT NOT NULL,
+    step TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    wall_seconds REAL NOT NULL,
+    cpu_seconds REAL,
+    max_rss_kb INTEGER,
+    exit_code INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS steps_project_step ON steps (project, step, started_at);
+"""
+
+# Differences below these are noise, whatever the relative increase
+MIN_DELTAS = {'wall_seconds': 1.0, 'cpu_seconds': 1.0, 'max_rss_kb': 10 * 1024}
+
+_lock = threading.Lock()
+_commit_sha = None
+
+
+def get_commit_sha():
+    global _commit_sha
+    if _commit_sha is None:
+        _commit_sha = os.getenv('GITHUB_SHA')
+        if not _commit_sha:
+            result = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True)
+            _commit_sha = result.stdout.strip() if result.returncode == 0 else 'unknown'
+    return _commit_sha
+
+
+def connect(path=METRICS_DB):
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def record_step(project, step, started_at, wall_seconds, cpu_seconds, max_rss_kb, exit_code, path=METRICS_DB):
+    with _lock:
+        connection = connect(path)
+        with connection:
+            connection.execute(
+                "INSERT INTO steps (commit_sha, project, step, started_at, wall_seconds, cpu_seconds, max_rss_kb, exit_code) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (get_commit_sha(), project, step, started_at, wall_seconds, cpu_seconds, max_rss_kb, exit_code))
+        connection.close()
+
+
+def find_regressions(threshold, window, path=METRICS_DB):
+    # Compare the last successful run of each (project, step) with the median of
+    # the previous successful runs
+    connection = connect(path)
+    rows = connection.execute(
+        "SELECT project, step, commit_sha, wall_seconds, cpu_seconds, max_rss_kb FROM steps "
+        "WHERE exit_code = 0 ORDER BY project, step, started_at").fetchall()
+    connection.close()
+
+    runs = {}
+    for project, step, commit_sha, wall, cpu, rss in rows:
+        runs.setdefault((project, step), []).append((commit_sha, wall, cpu, rss))
+
+    regressions = []
+    for (project, step), history in runs.items():
+        if len(history) < 2:
+            continue
+        commit_sha, *latest = history[-1]
+        baseline_runs = history[-window - 1:-1]
+        for index, metric in enumerate(('wall_seconds', 'cpu_seconds', 'max_rss_kb')):
+            values = [run[index + 1] for run in baseline_runs if run[index + 1] is not None]
+            if not values or latest[index] is None:
+                continue
+            baseline = statistics.median(values)
+            if latest[index] > baseline * (1 + threshold) and latest[index] - baseline > MIN_DELTAS[metric]:
+                regressions.append((project, step, metric, commit_sha, baseline, latest[index]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline step timing history")
+    parser.add_argument('--db', default=METRICS_DB)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    regressions_parser = subparsers.add_parser('regressions', help="flag steps slower than their rolling baseline")
+    regressions_parser.add_argument('--threshold', type=float, default=0.2,
+                                    help="allowed increase over the baseline median (default 0.2 = 20%%)")
+    regressions_parser.add_argument('--window', type=int, default=10,
+                                    help="number of previous runs in the baseline (default 10)")
+    regressions_parser.add_argument('--fail', action='store_true', help="exit with 1 when a regression is found")
+
+    history_parser = subparsers.add_parser('history', help="print the recorded steps")
+    history_parser.add_argument('--limit', type=int, default=50)
+
+    args = parser.parse_args()
+
+    if args.command == 'history':
+        connection = connect(args.db)
+        rows = connection.execute(
+            "SELECT commit_sha, project, step, wall_seconds, cpu_seconds, max_rss_kb, exit_code FROM steps "
+            "ORDER BY started_at DESC LIMIT ?", (args.limit,)).fetchall()
+        connection.close()
+        print(f"{'Commit':<10} {'Project':<25} {'Step':<25} {'Wall (s)':>9} {'CPU (s)':>9} {'RSS (MB)':>9} {'Exit':>5}")
+        for commit_sha, project, step, wall, cpu, rss, exit_code in rows:
+            print(f"{commit_sha[:8]:<10} {project:<25} {step:<25} {wall:>9.1f} {cpu or 0:>9.1f} "
+                  f"{(rss or 0) / 1024:>9.0f} {exit_code:>5}")
+        return
+
+    regressions = find_regressions(args.threshold, args.window, args.db)
+    if not regressions:
+        print("No regression found")
+        return
+    for project, step, metric, commit_sha, baseline, latest in regressions:
+        print(f"Regression: {project} {step} {metric} {baseline:.1f} -> {latest:.1f} at {commit_sha[:8]}")
+    if args.fail:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
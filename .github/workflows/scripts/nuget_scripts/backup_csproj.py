@@ -1,19 +1,32 @@
 import os
-# get environment variables
-LIB_PATH = os.getenv("LIB_PATH")
+import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from csproj_model import load_csproj
+from csproj_snapshot import SNAPSHOT_FILE, take_snapshot, write_snapshot
+from release_manifest import read_manifest
 
-#  get project names from projects.txt
-with open("projects.txt", "r") as file:
-    projects = file.read().strip().split()
 
-# backup each project file
-for project in projects:
-    src_file = os.path.join(LIB_PATH, project, f"{project}.csproj")
-    backup_file = os.path.join(LIB_PATH, project, f"{project}.csproj.bkp")
+def main():
+    # get environment variables
+    LIB_PATH = os.getenv("LIB_PATH")
 
-    with open(src_file, "rb") as src:
-        content = src.read()
 
-    with open(backup_file, "wb") as bkp:
-        bkp.write(content)
+    #  get project names from the release manifest
+    projects = read_manifest().names
+
+    # snapshot each project file before it is modified
+    files = {}
+    for project in projects:
+        src_file = os.path.join(LIB_PATH, project, f"{project}.csproj")
+        files[src_file] = load_csproj(src_file).content
+
+    snapshot = take_snapshot(files)
+    write_snapshot(snapshot)
+
+    stored = sum(1 for entry in snapshot['files'].values() if 'content' in entry)
+    print(f"Snapshot of {len(files)} project files written to {SNAPSHOT_FILE} ({stored} stored by content)")
+
+
+if __name__ == "__main__":
+    main()
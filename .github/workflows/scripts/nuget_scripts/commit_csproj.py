@@ -1,43 +1,42 @@
 import os
-import subprocess
+import sys
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from csproj_snapshot import load_snapshot
+from process_runner import run_command
+from release_journal import record
+from release_manifest import read_manifest
 
-def run_command(command):
-    try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print(result.stdout.strip())
-        print(result.stderr.strip())
-    except subprocess.CalledProcessError as e:
-        print(f"Error during execution: {e}")
-        print(e.stdout)
-        print(e.stderr)
-        raise
 
+def main():
+    # Get environment variables
+    bot_name = os.getenv("BOT_NAME")
+    bot_email = os.getenv("BOT_MAIL")
+    LIB_PATH = os.getenv("LIB_PATH")
+    github_head_ref = os.getenv("GITHUB_HEAD_REF")
 
-# Get environment variables
-bot_name = os.getenv("BOT_NAME")
-bot_email = os.getenv("BOT_MAIL")
-LIB_PATH = os.getenv("LIB_PATH")
-github_head_ref = os.getenv("GITHUB_HEAD_REF")
+    # Config git
+    run_command(["git", "config", "--global", "user.name", bot_name])
+    run_command(["git", "config", "--global", "user.email", bot_email])
 
-# Config git
-run_command(["git", "config", "--global", "user.name", bot_name])
-run_command(["git", "config", "--global", "user.email", bot_email])
+    # Fetch the latest changes
+    run_command(["git", "fetch", "origin", github_head_ref])
 
-# Fetch the latest changes
-run_command(["git", "fetch", "origin", github_head_ref])
+    # Get project names from the release manifest
+    projects = read_manifest().names
 
-# Get project names from projects.txt
-with open("projects.txt", "r") as file:
-    projects = file.read().strip().split()
+    # Add each project file
+    project_files = [os.path.join(LIB_PATH, project, f"{project}.csproj") for project in projects]
+    for project_file in project_files:
+        run_command(["git", "add", project_file])
 
-# Add each project file
-for project in projects:
-    project_file = os.path.join(LIB_PATH, project, f"{project}.csproj")
-    run_command(["git", "add", project_file])
+    # Commit changes
+    run_command(["git", "commit", "-m", "Update project versions"])
 
-# Commit changes
-run_command(["git", "commit", "-m", "Update project versions"])
+    # Push changes
+    record('csproj_commit', snapshot=load_snapshot(), branch=github_head_ref)
+    run_command(["git", "push", "--force"])
 
-# Push changes
-run_command(["git", "push", "--force"])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from csproj_model import load_csproj
+from nuget_feed import FeedError, get_published_versions
+from pr_parser import Diagnostic
+from process_runner import run, CommandError, CommandTimeout
+from release_manifest import VERSION_PATTERN, bump_version, read_manifest
+
+# Every precondition of a release is checked before anything is changed, all
+# the checks run concurrently and their problems are reported together
+
+
+def _git(*args):
+    # Output of a git command, without printing it
+    return run(['git', *args], on_line=lambda line, is_stderr: None).stdout
+
+
+def check_csproj(releases, lib_path):
+    diagnostics = []
+    for release in releases:
+        csproj = os.path.join(lib_path, release.name, f"{release.name}.csproj")
+        try:
+            version = load_csproj(csproj).version or '0.0.0'
+        except FileNotFoundError:
+            diagnostics.append(Diagnostic(0, f"{release.name}: project file not found: {csproj}"))
+            continue
+        except ET.ParseError as e:
+            diagnostics.append(Diagnostic(0, f"{release.name}: cannot parse {csproj}: {e}"))
+            continue
+        if not VERSION_PATTERN.match(version):
+            diagnostics.append(Diagnostic(0, f"{release.name}: <Version> {version} is not major.minor.patch"))
+        elif version != release.oldversion:
+            diagnostics.append(Diagnostic(0, f"{release.name}: <Version> is {version} but the release "
+                                             f"starts from {release.oldversion}"))
+        elif bump_version(version, release.type) != release.newversion:
+            diagnostics.append(Diagnostic(0, f"{release.name}: {release.newversion} is not the "
+                                             f"{release.type} bump of {version}"))
+    return diagnostics
+
+
+def check_tags(releases, remote):
+    # The tag of a release must exist neither locally nor on the remote
+    tags = [release.tag for release in releases]
+    diagnostics = []
+    local = set(_git('tag', '-l', *tags).split())
+    for tag in local:
+        diagnostics.append(Diagnostic(0, f"Tag {tag} already exists locally"))
+    try:
+        output = _git('ls-remote', '--tags', remote, *[f"refs/tags/{tag}" for tag in tags])
+    except (CommandError, CommandTimeout) as e:
+        return diagnostics + [Diagnostic(0, f"Cannot list the tags of {remote}: {e}", 'warning')]
+    for line in output.splitlines():
+        tag = line.split('refs/tags/', 1)[-1]
+        if tag in tags and tag not in local:
+            diagnostics.append(Diagnostic(0, f"Tag {tag} already exists on {remote}"))
+    return diagnostics
+
+
+def check_feed(releases, nuget_registry, nuget_api_key):
+    if not nuget_registry:
+        return [Diagnostic(0, "NUGET_REGISTRY is not set")]
+    try:
+        published = get_published_versions(nuget_registry, [release.name for release in releases], nuget_api_key)
+    except FeedError as e:
+        return [Diagnostic(0, f"Cannot read the feed: {e}")]
+    return [Diagnostic(0, f"{release.name} {release.newversion} is already on the feed")
+            for release in releases if release.newversion.lower() in published[release.name]]
+
+
+def check_changelogs(releases):
+    # The changelog becomes the release notes of the package and of the release
+    return [Diagnostic(0, f"{release.name}: no changelog in the pull request body")
+            for release in releases if not release.changelog]
+
+
+def run_checks(checks):
+    # checks maps a name to a function without arguments returning diagnostics.
+    # Returns {name: (diagnostics, seconds)}, a check that raises is reported as an error.
+    def timed(check):
+        start = time.monotonic()
+        try:
+            diagnostics = check()
+        except Exception as e:
+            diagnostics = [Diagnostic(0, f"Check failed: {e}")]
+        return diagnostics, time.monotonic() - start
+
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        return dict(zip(checks, pool.map(timed, checks.values())))
+
+
+def print_report(results):
+    # Returns True when no check found an error
+    for name, (diagnostics, seconds) in results.items():
+        errors = sum(d.severity == 'error' for d in diagnostics)
+        print(f"{name}: {'FAILED' if errors else 'OK'} ({seconds:.2f}s)")
+        for diagnostic in diagnostics:
+            print(f"  {diagnostic}")
+    return not any(d.severity == 'error' for diagnostics, _ in results.values() for d in diagnostics)
+
+
+def main():
+    LIB_PATH = os.getenv('LIB_PATH')
+    nuget_registry = os.getenv('NUGET_REGISTRY')
+    nuget_api_key = os.getenv('NUGET_API_KEY')
+    remote = os.getenv('GIT_REMOTE', 'origin')
+
+    releases = read_manifest().projects
+    start = time.monotonic()
+    results = run_checks({
+        'csproj': lambda: check_csproj(releases, LIB_PATH),
+        'tags': lambda: check_tags(releases, remote),
+        'feed': lambda: check_feed(releases, nuget_registry, nuget_api_key),
+        'changelogs': lambda: check_changelogs(releases),
+    })
+    print(f"Pre-flight checks completed in {time.monotonic() - start:.2f}s")
+    if not print_report(results):
+        print("The release would fail, nothing was changed")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
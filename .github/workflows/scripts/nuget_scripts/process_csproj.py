@@ -1,80 +1,45 @@
 import os
-import xml.etree.ElementTree as ET
-import json
+import sys
 
-# Méthode pour écrire avec un formatage indente
-def indent(elem, level=0):
-    i = "\n" + level * "  "
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "  "
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for subelem in elem:
-            indent(subelem, level + 1)
-        if not subelem.tail or not subelem.tail.strip():
-            subelem.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from csproj_editor import CsprojEditError, edit_csproj
+from csproj_model import load_csproj
+from release_manifest import read_manifest
 
-def update_or_add_element(container, name, value=None, attributes=None):
-    element = container.find(name)
-    if element is not None:
-        # Modifier l'élément existant
-        element.text = value
-    elif value is not None:
-        # Ajouter un nouvel élément avec une valeur de texte
-        new_element = ET.SubElement(container, name)
-        new_element.text = value
-    else:
-        # Ajouter un nouvel élément avec des attributs
-        new_element = ET.SubElement(container, name)
-        if attributes:
-            for attr_name, attr_value in attributes.items():
-                new_element.set(attr_name, attr_value)
-        # Si aucune valeur de texte n'est spécifiée, laisser l'élément vide
 
-# Récupérer les variables d'environnement
-LIB_PATH = os.getenv("LIB_PATH")
-projects = os.getenv("PROJECTS").split()
-newversions = os.getenv("NEW_VERSION").split()
-changelogs = json.loads(os.getenv("CHANGELOG"))
+def main():
+    # Récupérer les variables d'environnement
+    LIB_PATH = os.getenv("LIB_PATH")
+    manifest = read_manifest()
 
-# Parcourir les projets et mettre à jour les fichiers .csproj
-for project in projects:
-    project_path = os.path.join(LIB_PATH, project)
-    csproj_file = os.path.join(project_path, f"{project}.csproj")
-    readme_file = os.path.join(project_path, "README.md")
-    new_version = newversions[projects.index(project)]   
+    # Parcourir les projets et mettre à jour les fichiers .csproj, seuls les
+    # éléments modifiés sont réécrits
+    for release in manifest.projects:
+        project = release.name
+        project_path = os.path.join(LIB_PATH, project)
+        csproj_file = os.path.join(project_path, f"{project}.csproj")
+        readme_file = os.path.join(project_path, "README.md")
 
-    if project in changelogs:
         changes = ""
-        for change in changelogs[project]:
+        for change in release.changelog:
             changes += f"- {change}\n"
-    
-    tree = ET.parse(csproj_file)
-    root = tree.getroot()
 
-    # Trouver ou créer PropertyGroup
-    property_group = root.find('PropertyGroup')
-    if property_group is None:
-        property_group = ET.SubElement(root, 'PropertyGroup')
+        # Mettre à jour ou ajouter les éléments Version, PackageReleaseNotes et PackageReadmeFile
+        properties = {"Version": release.newversion, "PackageReleaseNotes": changes}
+        items = []
+        if os.path.exists(readme_file):
+            properties["PackageReadmeFile"] = "README.md"
+            items.append(("None", {"Include": "README.md", "Pack": "true", "PackagePath": ""}))
 
-    # Trouver ou créer ItemGroup
-    item_group = root.find('ItemGroup')
-    if item_group is None:
-        item_group = ET.SubElement(root, 'ItemGroup')
+        try:
+            editor = edit_csproj(csproj_file, properties, items, content=load_csproj(csproj_file).content)
+        except CsprojEditError as e:
+            print(f"Error editing {csproj_file}: {e}")
+            sys.exit(1)
 
-    # Mettre à jour ou ajouter les éléments Version, PackageReleaseNotes et PackageReadmeFile
-    update_or_add_element(property_group, "Version", value=new_version)
-    update_or_add_element(property_group, "PackageReleaseNotes", value=changes)
-    if os.path.exists(readme_file):
-        update_or_add_element(property_group, "PackageReadmeFile", "README.md")
-        update_or_add_element(item_group, 'None', attributes={'Include': 'README.md', 'Pack': 'true', 'PackagePath': ''})
+        # Afficher les modifications du fichier .csproj
+        print(editor.diff(csproj_file) or f"{csproj_file} unchanged")
 
-    indent(root)
-    tree.write(csproj_file, encoding="utf-8", xml_declaration=True)
 
-    # Afficher le fichier .csproj mis à jour
-    ET.dump(root)
+if __name__ == "__main__":
+    main()
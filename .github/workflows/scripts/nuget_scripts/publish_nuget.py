@@ -1,52 +1,243 @@
-import subprocess
+import glob
+import hashlib
+import json
 import sys
 import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-def run_command(command):
-    try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print("STDOUT:", result.stdout.strip())
-        print("STDERR:", result.stderr.strip())
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command {command}: {e}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
-        sys.exit(1)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from nuget_feed import FeedError, get_missing
+from nupkg_inspector import inspect_packages, print_report
+from project_graph import load_project_graph, get_closures, get_release_dependencies, get_tiers
+from process_runner import run, CommandError, CommandTimeout
+from release_journal import record
+from release_manifest import read_manifest
 
-def read_file_to_list(filename):
+# 'project' packs each project on its own, every pack building its references
+# again. 'build-once' builds the released projects in a single build and packs
+# them without building.
+PACK_MODES = ('project', 'build-once')
+# 'missing' only packs and pushes the versions not yet on the feed, so that a
+# publish interrupted halfway can simply be run again
+PUSH_MODES = ('all', 'missing')
+CONFIGURATION = 'Release'
+
+def run_command(command, project):
+    # Output lines are prefixed by the project so that concurrent commands stay readable
+    step = ' '.join(command[:3] if command[1] == 'nuget' else command[:2])
     try:
-        with open(filename, 'r') as file:
-            return file.read().strip().split()
-    except FileNotFoundError:
-        print(f"File not found: {filename}")
-        sys.exit(1)
+        run(command, name=project, step=step, project=project)
+    except (CommandError, CommandTimeout) as e:
+        raise RuntimeError(f"Error running command {step} for {project}: {e}")
+
+def get_solution_file(lib_path):
+    # The solution next to the library folder (src/Lionk.sln for src/Lib)
+    sln_files = sorted(glob.glob(os.path.join(os.path.dirname(os.path.normpath(lib_path)), '*.sln')))
+    if len(sln_files) != 1:
+        raise RuntimeError(f"Expected one solution next to {lib_path}, found {sln_files}")
+    return os.path.abspath(sln_files[0])
+
+def write_solution_filter(projects, lib_path, sln_file, directory):
+    # Solution filter of the released projects, their references are built with them
+    sln_dir = os.path.dirname(sln_file)
+    paths = []
+    for project in projects:
+        csproj = os.path.abspath(os.path.join(lib_path, project, f"{project}.csproj"))
+        # Solution paths use windows separators
+        paths.append(os.path.relpath(csproj, sln_dir).replace(os.sep, '\\'))
+    path = os.path.join(directory, 'release.slnf')
+    with open(path, 'w') as file:
+        json.dump({'solution': {'path': sln_file, 'projects': paths}}, file, indent=2)
+    return path
+
+def build(projects, lib_path):
+    # A single build of every released project: shared references are built once
+    start = time.monotonic()
+    sln_file = get_solution_file(lib_path)
+    with tempfile.TemporaryDirectory() as directory:
+        slnf = write_solution_filter(projects, lib_path, sln_file, directory)
+        run_command(['dotnet', 'build', slnf, '-c', CONFIGURATION], 'build')
+    return time.monotonic() - start
+
+def get_sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def verify_package(project, newversion, lib_path):
+    # The assemblies of the package must be the ones of the single build,
+    # a pack that rebuilt or picked up stale outputs fails the release
+    package = f"./output/{project}.{newversion}.nupkg"
+    output_dir = os.path.join(lib_path, project, 'bin', CONFIGURATION)
+    checked = 0
+    with zipfile.ZipFile(package) as nupkg:
+        for entry in nupkg.namelist():
+            parts = entry.split('/')
+            if len(parts) != 3 or parts[0] != 'lib' or not parts[2].endswith('.dll'):
+                continue
+            built = os.path.join(output_dir, parts[1], parts[2])
+            try:
+                with open(built, 'rb') as file:
+                    expected = get_sha256(file.read())
+            except FileNotFoundError:
+                raise RuntimeError(f"{entry} of {package} is not in the build output {built}")
+            if get_sha256(nupkg.read(entry)) != expected:
+                raise RuntimeError(f"{entry} of {package} differs from the build output {built}")
+            checked += 1
+    if not checked:
+        raise RuntimeError(f"No assembly found in {package}")
+    print(f"[{project}] {checked} packed assemblies match the build output")
+
+def pack(project, csproj, newversion, lib_path, no_build):
+    start = time.monotonic()
+    if no_build:
+        run_command(['dotnet', 'pack', csproj, '-c', CONFIGURATION, '--no-build', '-o', './output'], project)
+        verify_package(project, newversion, lib_path)
+    else:
+        run_command(['dotnet', 'pack', csproj, '-o', './output'], project)
+    return time.monotonic() - start
+
+def push(project, newversion, nuget_api_key, nuget_registry):
+    start = time.monotonic()
+    record('nuget_push', package=project, version=newversion)
+    run_command(['dotnet', 'nuget', 'push', f"./output/{project}.{newversion}.nupkg",
+                    '-k', nuget_api_key, '-s', nuget_registry], project)
+    return time.monotonic() - start
+
+class PackageError(RuntimeError):
+    pass
+
+def pack_all(projects, versions, dependencies, closures, lib_path, workers, no_build, timings):
+    # Pack a project as soon as its released dependencies are packed.
+    # Each pack builds its whole reference closure, two packs whose closures
+    # overlap would write the same obj and bin folders, so they never run
+    # together. Without build the packs do not depend on each other.
+    packed = set()
+    pending = list(projects)
+    running = {}
+    building = set()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
 
-LIB_PATH = os.getenv('LIB_PATH')
-nuget_registry = os.getenv('NUGET_REGISTRY')
-nuget_api_key = os.getenv('NUGET_API_KEY')
+        def schedule_ready():
+            for project in list(pending):
+                if no_build or (all(dep in packed for dep in dependencies[project])
+                                and not closures[project] & building):
+                    pending.remove(project)
+                    if not no_build:
+                        building.update(closures[project])
+                    csproj = os.path.join(lib_path, project, f"{project}.csproj")
+                    print(f"Packing {csproj} as version {versions[project]}")
+                    running[pool.submit(pack, project, csproj, versions[project], lib_path, no_build)] = project
 
-print(f"LIB_PATH: {LIB_PATH}")
-print(f"NUGET_REGISTRY: {nuget_registry}")
-print(f"NUGET_API_KEY: {'******' if nuget_api_key else None}")
+        schedule_ready()
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                project = running.pop(future)
+                timings[project]['pack'] = future.result()
+                packed.add(project)
+                if not no_build:
+                    building.difference_update(closures[project])
+            schedule_ready()
 
-projects = read_file_to_list('projects.txt')
-newversions = read_file_to_list('newversions.txt')
+def push_all(projects, versions, nuget_api_key, nuget_registry, workers, timings):
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for project in projects:
+            print(f"Pushing {project} {versions[project]}")
+            futures[pool.submit(push, project, versions[project], nuget_api_key, nuget_registry)] = project
+        for future in futures:
+            timings[futures[future]]['push'] = future.result()
 
-if len(projects) == 0:
-    print("No projects to publish")
-    sys.exit(1)
+def publish(releases, dependencies, closures, lib_path, nuget_api_key, nuget_registry, workers, no_build=False):
+    # Pack every project, inspect every package against the release manifest,
+    # and only then push: a bad package stops the release before anything is
+    # published
+    projects = [release.name for release in releases]
+    versions = {release.name: release.newversion for release in releases}
+    timings = {project: {} for project in projects}
 
-if len(projects) != len(newversions):
-    print("Mismatch between number of projects and versions")
-    sys.exit(1)
+    pack_all(projects, versions, dependencies, closures, lib_path, workers, no_build, timings)
 
-for i, project in enumerate(projects):
-    newversion = newversions[i]
-    project_path = os.path.join(LIB_PATH, project)
-    csproj = os.path.join(project_path, f"{project}.csproj")
+    start = time.monotonic()
+    results = inspect_packages(releases, './output', lib_path, workers)
+    print(f"Inspected {len(results)} packages in {time.monotonic() - start:.2f}s")
+    if not print_report(results):
+        raise PackageError("Invalid packages, nothing was pushed")
 
-    print(f"Publishing {csproj} as version {newversion}")
+    push_all(projects, versions, nuget_api_key, nuget_registry, workers, timings)
+    return timings
+
+def print_timings(timings, total):
+    print("Publish timings:")
+    print(f"{'Project':<30} {'Pack (s)':>10} {'Push (s)':>10}")
+    for project, steps in timings.items():
+        print(f"{project:<30} {steps.get('pack', 0):>10.1f} {steps.get('push', 0):>10.1f}")
+    print(f"Total: {total:.1f}s")
+
+def main():
+    LIB_PATH = os.getenv('LIB_PATH')
+    nuget_registry = os.getenv('NUGET_REGISTRY')
+    nuget_api_key = os.getenv('NUGET_API_KEY')
+    workers = int(os.getenv('PUBLISH_WORKERS', os.cpu_count() or 1))
+    pack_mode = os.getenv('PACK_MODE') or 'project'
+    push_mode = os.getenv('PUSH_MODE') or 'all'
+
+    print(f"LIB_PATH: {LIB_PATH}")
+    print(f"NUGET_REGISTRY: {nuget_registry}")
+    print(f"NUGET_API_KEY: {'******' if nuget_api_key else None}")
+    print(f"PUBLISH_WORKERS: {workers}")
+    print(f"PACK_MODE: {pack_mode}")
+    print(f"PUSH_MODE: {push_mode}")
+
+    if pack_mode not in PACK_MODES:
+        print(f"Invalid PACK_MODE: {pack_mode}, expected one of {PACK_MODES}")
+        sys.exit(1)
+    if push_mode not in PUSH_MODES:
+        print(f"Invalid PUSH_MODE: {push_mode}, expected one of {PUSH_MODES}")
+        sys.exit(1)
+
+    manifest = read_manifest()
+    projects = manifest.names
+
+    if push_mode == 'missing':
+        try:
+            missing, present = get_missing(nuget_registry, [(p, manifest.get(p).newversion) for p in projects],
+                                           nuget_api_key, workers)
+        except FeedError as e:
+            print(e)
+            sys.exit(1)
+        for project, version in present:
+            print(f"{project} {version} is already on the feed, skipped")
+        projects = [project for project, _ in missing]
+        if len(projects) == 0:
+            print("Every package is already on the feed")
+            return
+
+    graph = load_project_graph(LIB_PATH)
+    dependencies = get_release_dependencies(graph, projects)
+    closures = get_closures(graph, projects)
+    try:
+        tiers = get_tiers(dependencies)
+    except ValueError as e:
+        print(e)
+        sys.exit(1)
+    for i, tier in enumerate(tiers):
+        print(f"Tier {i}: {tier}")
+
+    start = time.monotonic()
+    no_build = pack_mode == 'build-once'
+    try:
+        if no_build:
+            print(f"Build: {build(projects, LIB_PATH):.1f}s")
+        timings = publish([manifest.get(project) for project in projects], dependencies, closures, LIB_PATH,
+                          nuget_api_key, nuget_registry, workers, no_build)
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    print_timings(timings, time.monotonic() - start)
 
-    run_command(['dotnet', 'pack', csproj, '-o', './output'])
-    run_command(['dotnet', 'nuget', 'push', f"./output/{project}.{newversion}.nupkg", 
-                    '-k', nuget_api_key, '-s', nuget_registry])
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,112 @@
-import subprocess
 import sys
 import os
-import json
+from concurrent.futures import ThreadPoolExecutor
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from change_detector import save_released_state
+import git_tags
+from github_api import GitHubClient, GitHubError
+from process_runner import run_command, CommandError, CommandTimeout
+from release_journal import record
+from release_manifest import read_manifest
 
-def run_command(command):
+
+def get_release_notes(release):
+    # Build the release notes from the changelog
+    changes = f"## {release.newversion} Changelog"
+    for change in release.changelog:
+        changes += f"\n- {change}"
+    return changes
+
+def create_tags(releases, remote='origin'):
+    # Annotated tags are created locally, nothing reaches the remote yet.
+    # A tag left on the same commit by a previous attempt is reused.
     try:
-        result = subprocess.run(command, check=True, capture_output=True, text=True)
-        print("STDOUT:", result.stdout.strip())
-        print("STDERR:", result.stderr.strip())
-    except subprocess.CalledProcessError as e:
-        print(f"Error running command {command}: {e}")
-        print("STDOUT:", e.stdout)
-        print("STDERR:", e.stderr)
+        git_tags.create_tags(remote, [release.tag for release in releases])
+    except (ValueError, CommandError, CommandTimeout) as e:
+        print(e)
         sys.exit(1)
 
-def read_file_to_list(filename):
+def push_tags(releases, remote='origin'):
+    # One round-trip for all the tags, and either all of them are pushed or none.
+    # Only the tags missing from the remote are pushed and journaled, so that a
+    # rollback never deletes a tag this release did not push.
     try:
-        with open(filename, 'r') as file:
-            return file.read().strip().split()
-    except FileNotFoundError:
-        print(f"File not found: {filename}")
+        tags, pushed = git_tags.get_tags_to_push(remote, [release.tag for release in releases])
+    except ValueError as e:
+        print(e)
         sys.exit(1)
+    if pushed:
+        print(f"Tags already on {remote}: {pushed}")
+    if not tags:
+        return
+    record('tag_push', tags=tags, remote=remote)
+    run_command(['git', 'push', '--atomic', remote, *[f"refs/tags/{tag}" for tag in tags]])
 
-bot_name = os.getenv('BOT_NAME')
-bot_mail = os.getenv('BOT_MAIL')
-changelogs = json.loads(os.getenv("CHANGELOG"))
-
-projects = read_file_to_list('projects.txt')
-newversions = read_file_to_list('newversions.txt')
-
-print(f"Projects: {projects}")
-print(f"New versions: {newversions}")
+def create_release(client, repository, release):
+    # Returns None on success, or the error message. A release that already
+    # exists is kept and not journaled, the rollback must not delete it.
+    try:
+        response = client.request('GET', f"/repos/{repository}/releases/tags/{release.tag}")
+        if response.status == 200:
+            print(f"Release {release.tag} already exists")
+            return None
+        if response.status != 404:
+            return f"GitHub API error {response.status}: {response.body.decode(errors='replace')}"
+        record('release_create', tag=release.tag, repository=repository)
+        response = client.request('POST', f"/repos/{repository}/releases", body={
+            'tag_name': release.tag,
+            'name': release.tag,
+            'body': get_release_notes(release),
+        })
+    except GitHubError as e:
+        return str(e)
+    if response.status >= 400:
+        return f"GitHub API error {response.status}: {response.body.decode(errors='replace')}"
+    print(f"Release {release.tag} created")
+    return None
 
-if len(projects) == 0:
-    print("No projects to process")
-    sys.exit(1)
+def create_releases(client, repository, releases, workers):
+    # The releases are independent once their tags are pushed
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        errors = pool.map(lambda release: create_release(client, repository, release), releases)
+        return {release.tag: error for release, error in zip(releases, errors) if error}
 
-run_command(['git', 'config', '--global', 'user.name', bot_name])
-run_command(['git', 'config', '--global', 'user.email', bot_mail])
+def main():
+    bot_name = os.getenv('BOT_NAME')
+    bot_mail = os.getenv('BOT_MAIL')
+    github_token = os.getenv('GITHUB_TOKEN')
+    # Both are set by GitHub Actions, the api url can point to a stub server
+    api_url = os.getenv('GITHUB_API_URL', 'https://api.github.com')
+    repository = os.getenv('GITHUB_REPOSITORY')
+    remote = os.getenv('GIT_REMOTE', 'origin')
+    workers = int(os.getenv('RELEASE_WORKERS', 4))
+    manifest = read_manifest()
 
-for i, project in enumerate(projects):
-    newversion = newversions[i]
-    tag = f"{project}_{newversion}"
+    print(f"Projects: {manifest.names}")
+    print(f"New versions: {[release.newversion for release in manifest.projects]}")
 
-    print(f"Creating tag {tag}")
+    if not repository:
+        print("Environment variable GITHUB_REPOSITORY must be set.")
+        sys.exit(1)
 
-    # Create the tag
+    run_command(['git', 'config', '--global', 'user.name', bot_name])
+    run_command(['git', 'config', '--global', 'user.email', bot_mail])
 
-    run_command(['git', 'tag', '-a', tag, '-m', f"Release {tag}"])
-    run_command(['git', 'push', 'origin', tag])
+    create_tags(manifest.projects, remote)
+    push_tags(manifest.projects, remote)
 
-    # Extract description from description.txt
-    changelog = ""
-    if project in changelogs:
-        changes = f"## {newversion} Changelog"
-        for change in changelogs[project]:
-            changes += f"\n- {change}"
+    with GitHubClient(github_token, api_url, max_connections=workers, etag_cache_file=None) as client:
+        errors = create_releases(client, repository, manifest.projects, workers)
+    for tag, error in errors.items():
+        print(f"Error creating release {tag}: {error}")
+    if errors:
+        sys.exit(1)
 
-    # Create the release with the description
-    run_command(['gh', 'release', 'create', tag, '--title', tag, '--notes', changes])
+    # The release is published, its projects are the reference of the next INCREMENTAL run
+    if os.getenv('INCREMENTAL'):
+        lib_path = os.getenv('LIB_PATH')
+        save_released_state([os.path.join(lib_path, p, f"{p}.csproj") for p in manifest.names])
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+import backup_csproj
+import commit_csproj
+import preflight
+import process_csproj
+import process_pr
+import publish_nuget
+import publish_release
+from release_pipeline import Stage, main
+
+STAGES = [
+    Stage('prepare', [process_pr.main]),
+    # Nothing is changed before every precondition of the release is checked
+    Stage('preflight', [preflight.main]),
+    Stage('update_csproj', [backup_csproj.main, process_csproj.main, commit_csproj.main]),
+    Stage('publish_nuget', [publish_nuget.main]),
+    Stage('publish_release', [publish_release.main]),
+]
+
+if __name__ == "__main__":
+    main('nuget', STAGES)
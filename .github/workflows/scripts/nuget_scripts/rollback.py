@@ -0,0 +1,9 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'common_scripts'))
+from release_rollback import main
+
+if __name__ == "__main__":
+    # Undo the steps recorded in the release journal, whatever job they ran in
+    main()